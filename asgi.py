@@ -0,0 +1,7 @@
+from volumx.asgi import create_asgi_app
+from run import app as flask_app
+
+
+# Async entry point, e.g. `uvicorn asgi:app --workers 4`. The Flask app
+# and its configuration come from run.py.
+app = create_asgi_app(flask_app)
@@ -0,0 +1,230 @@
+"""
+Shared pieces of the HTTP benchmarks: a deterministic seed database, a
+gunicorn server started from gunicorn.conf.py or a uvicorn server for the
+ASGI mode, and a closed-loop load generator reporting throughput and
+latency percentiles.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from uuid import UUID
+import http.client
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+PASSWORD = "benchmark-password"
+
+
+def database_env(database_path):
+    """Environment for the app on an SQLite file, quiet enough to benchmark"""
+    return {
+        **os.environ,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{database_path}",
+        "JWT_SECRET_KEY": os.environ.get("JWT_SECRET_KEY", "benchmark-jwt-secret-key-0123456789"),
+        "QUERY_STATS_LOG_LEVEL": "WARNING",
+    }
+
+
+def seed_database(database_path, rows, seed=0, password_method="scrypt"):
+    """Create a database of rows users, each owning one business.
+
+    Ids and values come from a seeded random generator, so the same
+    arguments always give the same data. Every user's password is PASSWORD.
+
+    Returns:
+        dict: business_ids, user_ids and emails
+    """
+    os.environ.update(database_env(database_path))
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    import contextlib
+    import io
+    from sqlalchemy import insert
+    from werkzeug.security import generate_password_hash
+    from volumx import create_app, db
+    from volumx.config import Config
+    from volumx.models.business import Address, Business, BusinessUserRights, Contact
+    from volumx.models.user import User
+
+    if os.path.exists(database_path):
+        os.remove(database_path)
+    rng = random.Random(seed)
+
+    def new_id():
+        return UUID(int=rng.getrandbits(128), version=4).hex
+
+    started = datetime(2026, 1, 1)
+    password = generate_password_hash(PASSWORD, password_method)
+    tables = {User: [], Address: [], Contact: [], Business: [], BusinessUserRights: []}
+    for i in range(rows):
+        created = {"createdAt": started + timedelta(seconds=i), "updatedAt": started + timedelta(seconds=i)}
+        user_id, address_id, contact_id, business_id = new_id(), new_id(), new_id(), new_id()
+        tables[User].append({
+            "id": user_id, "email": f"user{i}@example.com", "first_name": f"First{i}", "last_name": f"Last{i}",
+            "password": password, **created,
+        })
+        tables[Address].append({
+            "id": address_id, "fullAddress": f"{rng.randint(1, 999)} Main Road", "district": "District",
+            "city": rng.choice(["Bengaluru", "Chennai", "Delhi", "Mumbai", "Pune"]), "country": "IN",
+            "addressState": "State", "postalCode": f"{rng.randint(100000, 999999)}", "directions": "", **created,
+        })
+        tables[Contact].append({
+            "id": contact_id, "email": f"business{i}@example.com", "phoneCode": 91, "phoneNumber": 9000000000 + i,
+            "addressId": address_id, **created,
+        })
+        tables[Business].append({
+            "id": business_id, "legalName": f"Legal {i}", "displayName": f"Display {i}",
+            "websiteLink": f"https://business{i}.example.com", "currency": "INR",
+            "businessType": rng.choice(["retail", "wholesale", "services"]), "businessGst": f"GST{i}",
+            "businessPan": f"PAN{i}", "businessLogo": "logo.png", "orderSystem": rng.random() < 0.5,
+            "contactId": contact_id, **created,
+        })
+        tables[BusinessUserRights].append({
+            "id": new_id(), "businessId": business_id, "userId": user_id, "productRights": True,
+            "inventoryRights": True, "salesRights": rng.random() < 0.8, "salesPosRights": True,
+            "suppliersRights": True, "analyticsViewRights": True, "ownerRights": True, **created,
+        })
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_app(Config)
+    with app.app_context():
+        for model, model_rows in tables.items():
+            db.session.execute(insert(model), model_rows)
+        db.session.commit()
+        db.session.connection().exec_driver_sql("ANALYZE")
+        db.session.commit()
+        db.engine.dispose()
+    return {
+        "business_ids": [row["id"] for row in tables[Business]],
+        "user_ids": [row["id"] for row in tables[User]],
+        "emails": [row["email"] for row in tables[User]],
+    }
+
+
+@contextmanager
+def gunicorn_server(env, port, *args):
+    """Run gunicorn -c gunicorn.conf.py run:app until the block exits"""
+    env = {
+        **env,
+        "GUNICORN_BIND": f"127.0.0.1:{port}",
+        "GUNICORN_ACCESS_LOG": os.devnull,
+        "GUNICORN_ERROR_LOG": "-",
+    }
+    with server([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", *args, "run:app"], env, port) as process:
+        yield process
+
+
+@contextmanager
+def uvicorn_server(env, port, workers=1):
+    """Run uvicorn asgi:app, the optional ASGI mode, until the block exits"""
+    command = [
+        sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--no-access-log",
+    ]
+    with server(command, env, port) as process:
+        yield process
+
+
+@contextmanager
+def server(command, env, port):
+    """Start command in the repository root and wait until it answers on port"""
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+                connection.request("GET", "/cron")
+                connection.getresponse().read()
+                break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"{command[2]} did not start")
+                time.sleep(0.2)
+        yield process
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def run_load(port, duration, concurrency, pick_request, seed=0):
+    """Closed loop: each client sends its next request when the last answers.
+
+    Args:
+        pick_request: called with a random.Random, returns (label, method, path, body)
+        seed: seeds each client's generator, so runs send the same mix
+
+    Returns:
+        dict: per label and "all", requests/s, p50 and p99 in ms and errors
+    """
+    latencies = {}
+    errors = {}
+    lock = threading.Lock()
+    stop = time.monotonic() + duration
+
+    def client(number):
+        rng = random.Random(seed * 1000 + number)
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        while time.monotonic() < stop:
+            label, method, path, body = pick_request(rng)
+            headers = {"Content-Type": "application/json"} if body is not None else {}
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                failed = response.status >= 500
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                failed = True
+            elapsed = time.perf_counter() - started
+            with lock:
+                if failed:
+                    errors[label] = errors.get(label, 0) + 1
+                else:
+                    latencies.setdefault(label, []).append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(number,)) for number in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies["all"] = [latency for values in latencies.values() for latency in values]
+    errors["all"] = sum(errors.values())
+    return {
+        label: summarize(latencies.get(label, []), duration, errors.get(label, 0))
+        for label in {**latencies, **errors}
+    }
+
+
+def summarize(latencies, duration, errors):
+    latencies = sorted(latencies)
+    if not latencies:
+        return {"rps": 0.0, "p50_ms": None, "p99_ms": None, "errors": errors}
+    return {
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p99_ms": round(latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000, 1),
+        "errors": errors,
+    }
+
+
+def print_table(title, results):
+    """results: list of (name, stats) rows"""
+    print(title)
+    print(f"  {'':28s} {'req/s':>8s} {'p50 ms':>8s} {'p99 ms':>8s} {'errors':>7s}")
+    for name, stats in results:
+        print(f"  {name:28s} {stats['rps']:8.1f} {stats['p50_ms'] or 0:8.1f} {stats['p99_ms'] or 0:8.1f} {stats['errors']:7d}")
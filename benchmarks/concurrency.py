@@ -0,0 +1,78 @@
+"""
+How many requests in flight the sync deployment and the ASGI mode sustain.
+
+    python benchmarks/concurrency.py [--levels 16,64,256] [--workers 2] [--duration 15]
+
+Seeds an SQLite database (see common.seed_database), then for each client
+count in --levels drives the business read routes the ASGI mode serves
+asynchronously with closed-loop clients:
+  - GET /api/v1/business/<id>             40%
+  - GET /api/v1/business/?limit=50         30%
+  - GET /api/v1/business/<id>/user_rights  30%
+against two deployments with --workers processes each:
+  - sync: gunicorn from gunicorn.conf.py with gthread workers, so at most
+    workers * GUNICORN_THREADS requests are served at once and the rest
+    wait in the listen backlog
+  - asgi: uvicorn asgi:app (needs requirements-asgi.txt), async handlers on
+    an AsyncSession
+Reported per level: req/s, p50, p99 and errors (5xx or dropped connections).
+The level where the sync p99 climbs while the asgi one holds is the
+concurrency limit the thread count sets.
+"""
+import argparse
+import os
+import tempfile
+
+from common import database_env, gunicorn_server, print_table, run_load, seed_database, uvicorn_server
+
+
+def request_mix(data):
+    business_ids = data["business_ids"]
+
+    def pick(rng):
+        roll = rng.random()
+        if roll < 0.4:
+            return "business", "GET", f"/api/v1/business/{rng.choice(business_ids)}", None
+        if roll < 0.7:
+            return "business list", "GET", "/api/v1/business/?limit=50", None
+        return "business rights", "GET", f"/api/v1/business/{rng.choice(business_ids)}/user_rights", None
+
+    return pick
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--levels", default="16,64,256", help="comma separated client counts")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    try:
+        import a2wsgi, aiosqlite, starlette, uvicorn  # noqa: F401
+    except ImportError:
+        parser.error("the ASGI mode needs `pip install -r requirements-asgi.txt`")
+
+    database_path = os.path.join(tempfile.mkdtemp(prefix="concurrency-"), "concurrency.db")
+    data = seed_database(database_path, args.rows, seed=args.seed)
+    pick = request_mix(data)
+    env = {**database_env(database_path), "GUNICORN_WORKERS": str(args.workers)}
+    servers = {
+        "sync": lambda: gunicorn_server({**env, "GUNICORN_WORKER_CLASS": "gthread"}, args.port),
+        "asgi": lambda: uvicorn_server(env, args.port, workers=args.workers),
+    }
+
+    results = []
+    for name, start in servers.items():
+        with start():
+            run_load(args.port, min(args.duration, 3), 16, pick, seed=args.seed + 1)
+            for level in args.levels.split(","):
+                stats = run_load(args.port, args.duration, int(level), pick, seed=args.seed)
+                results.append((f"{name} {level} clients", stats["all"]))
+    print_table(f"{args.workers} workers each, {args.duration:g}s per level", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Throughput and latency of the gunicorn worker models on the real routes.
+
+    python benchmarks/load.py [--models sync,gthread,gevent] [--duration 20]
+                              [--concurrency 32] [--rows 5000] [--login-share 0.02]
+
+Seeds an SQLite database (the same data for the same --rows and --seed),
+then for each worker model starts gunicorn from gunicorn.conf.py, warms it
+up and drives it with closed-loop clients for --duration seconds. The mix:
+  - GET /api/v1/business/<id>             30%
+  - GET /api/v1/business/?limit=50         30%, first page with ?fields=
+  - GET /api/v1/business/<id>/user_rights  20%
+  - GET /api/v1/auth/users/<id>            20%
+with --login-share of all requests being POST /api/v1/auth/login, to show
+how a password hash holds up a worker. Worker counts come from
+gunicorn.conf.py unless GUNICORN_WORKERS / GUNICORN_THREADS are set.
+
+The clients run as threads of this process, so give the server the other
+cores: on a small machine compare the models against each other rather
+than reading the numbers as absolute capacity.
+"""
+import argparse
+import os
+import tempfile
+
+from common import database_env, gunicorn_server, print_table, run_load, seed_database, PASSWORD
+
+
+def request_mix(data, login_share):
+    business_ids, user_ids, emails = data["business_ids"], data["user_ids"], data["emails"]
+
+    def pick(rng):
+        if rng.random() < login_share:
+            return "login", "POST", "/api/v1/auth/login", {"email": rng.choice(emails), "password": PASSWORD}
+        roll = rng.random()
+        if roll < 0.3:
+            return "business", "GET", f"/api/v1/business/{rng.choice(business_ids)}", None
+        if roll < 0.6:
+            return "business list", "GET", "/api/v1/business/?limit=50&fields=legalName,displayName,contact.email", None
+        if roll < 0.8:
+            return "business rights", "GET", f"/api/v1/business/{rng.choice(business_ids)}/user_rights", None
+        return "user", "GET", f"/api/v1/auth/users/{rng.choice(user_ids)}", None
+
+    return pick
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--models", default="sync,gthread,gevent")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--login-share", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    database_path = os.path.join(tempfile.mkdtemp(prefix="load-"), "load.db")
+    data = seed_database(database_path, args.rows, seed=args.seed)
+    pick = request_mix(data, args.login_share)
+
+    for model in args.models.split(","):
+        if model == "gevent":
+            try:
+                import gevent  # noqa: F401
+            except ImportError:
+                print("gevent: skipped, `pip install gevent` to include it\n")
+                continue
+        env = {**database_env(database_path), "GUNICORN_WORKER_CLASS": model}
+        with gunicorn_server(env, args.port):
+            run_load(args.port, min(args.duration, 3), args.concurrency, pick, seed=args.seed + 1)
+            results = run_load(args.port, args.duration, args.concurrency, pick, seed=args.seed)
+        print_table(f"{model} ({args.concurrency} clients, {args.duration:g}s)", sorted(results.items()))
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Login throughput, and what a login burst does to the other routes.
+
+    python benchmarks/login.py [--workers 0,2] [--method scrypt] [--duration 15]
+                               [--concurrency 16] [--login-share 0.5]
+
+For each PASSWORD_HASH_WORKERS value (0 hashes inline on the request
+thread) gunicorn is started from gunicorn.conf.py with gthread workers, and
+closed-loop clients send POST /api/v1/auth/login for --login-share of their
+requests and GET /api/v1/business/<id> for the rest. Reported per route:
+req/s, p50 and p99. Logins answered 503 (hashing pool full) count as errors.
+
+Every seeded user's password is hashed with --method (a Werkzeug method
+string, also used as PASSWORD_HASH_METHOD so no login rehashes).
+"""
+import argparse
+import os
+import tempfile
+
+from common import database_env, gunicorn_server, print_table, run_load, seed_database, PASSWORD
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", default="0,2", help="comma separated PASSWORD_HASH_WORKERS values")
+    parser.add_argument("--method", default="scrypt")
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--login-share", type=float, default=0.5)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    database_path = os.path.join(tempfile.mkdtemp(prefix="login-"), "login.db")
+    data = seed_database(database_path, args.rows, seed=args.seed, password_method=args.method)
+
+    def pick(rng):
+        if rng.random() < args.login_share:
+            return "login", "POST", "/api/v1/auth/login", {"email": rng.choice(data["emails"]), "password": PASSWORD}
+        return "business", "GET", f"/api/v1/business/{rng.choice(data['business_ids'])}", None
+
+    for workers in args.workers.split(","):
+        env = {
+            **database_env(database_path),
+            "GUNICORN_WORKER_CLASS": "gthread",
+            "PASSWORD_HASH_METHOD": args.method,
+            "PASSWORD_HASH_WORKERS": workers,
+        }
+        with gunicorn_server(env, args.port):
+            run_load(args.port, min(args.duration, 3), args.concurrency, pick, seed=args.seed + 1)
+            results = run_load(args.port, args.duration, args.concurrency, pick, seed=args.seed)
+        title = f"PASSWORD_HASH_WORKERS={workers} {args.method} ({args.concurrency} clients, {args.duration:g}s)"
+        print_table(title, sorted(results.items()))
+        print()
+
+
+if __name__ == "__main__":
+    main()
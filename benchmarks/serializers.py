@@ -0,0 +1,109 @@
+"""
+Rows per second of the read serializers against the ORM path they replaced.
+
+    python benchmarks/serializers.py [--rows 20000] [--repeat 5] [--fields legalName,contact.email]
+
+Seeds an SQLite database with --rows businesses (see common.seed_database)
+and formats all of them, in-process and without HTTP, two ways:
+  - orm: business_query() hydrating Business -> Contact -> Address instances,
+    then copying attributes into dict literals, as the read routes did
+  - projection: serializer_for("business") selecting only its columns as
+    tuples and building the dicts from precompiled row positions
+With --fields the projection serializer is narrowed to those paths, as
+?fields= does; the orm path always loads whole rows.
+
+Each is run --repeat times on an empty session and the best run is
+reported, so the numbers compare the Python work, not a cold page cache.
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from common import seed_database
+
+
+def format_business(business):
+    """The dict literal the read routes built from a hydrated Business"""
+    address = business.contact.address
+    return {
+        "businessId": business.id,
+        "legalName": business.legalName,
+        "displayName": business.displayName,
+        "websiteLink": business.websiteLink,
+        "currency": business.currency,
+        "businessType": business.businessType,
+        "businessGst": business.businessGst,
+        "businessPan": business.businessPan,
+        "businessLogo": business.businessLogo,
+        "orderSystem": business.orderSystem,
+        "contact": {
+            "contactId": business.contact.id,
+            "email": business.contact.email,
+            "phoneCode": business.contact.phoneCode,
+            "phoneNumber": business.contact.phoneNumber,
+            "address": {
+                "addressId": address.id,
+                "fullAddress": address.fullAddress,
+                "district": address.district,
+                "city": address.city,
+                "country": address.country,
+                "addressState": address.addressState,
+                "postalCode": address.postalCode,
+                "directions": address.directions,
+            },
+        },
+    }
+
+
+def best_of(repeat, run):
+    """Fastest of repeat runs, with the rows the last one formatted"""
+    from volumx import db
+
+    timings = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        rows = run()
+        timings.append(time.perf_counter() - started)
+    return min(timings), len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--fields", default=None, help="comma separated paths, as ?fields= takes them")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    database_path = os.path.join(tempfile.mkdtemp(prefix="serializers-"), "serializers.db")
+    seed_database(database_path, args.rows, seed=args.seed)
+
+    from volumx import create_app
+    from volumx.business.routes import business_query
+    from volumx.config import Config
+    from volumx.serializers import serializer_for
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_app(Config)
+    with app.app_context():
+        serializer = serializer_for("business", args.fields)
+        runs = {
+            "orm": lambda: [format_business(business) for business in business_query().all()],
+            "projection": lambda: serializer.to_list(serializer.query().all()),
+        }
+        results = {name: best_of(args.repeat, run) for name, run in runs.items()}
+
+    print(f"{args.rows} businesses, best of {args.repeat}" + (f", fields={args.fields}" if args.fields else ""))
+    print(f"  {'':12s} {'ms':>9s} {'rows/s':>10s}")
+    for name, (elapsed, rows) in results.items():
+        print(f"  {name:12s} {elapsed * 1000:9.1f} {rows / elapsed:10.0f}")
+    orm, projection = results["orm"][0], results["projection"][0]
+    print(f"  projection is {orm / projection:.1f}x the orm path")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Worker startup time: how long imports plus create_app take.
+
+    python benchmarks/startup.py [--runs 7] [--database sqlite:////tmp/startup.db]
+
+Reports, in milliseconds:
+  - first boot: a fresh process with an empty Swagger cache, so the YAML
+    is parsed and the cache written
+  - cold: fresh processes with the Swagger cache in place, which is what a
+    gunicorn worker pays on every (re)start without preload
+  - warm: create_app alone, repeated in one process with the imports done
+
+Without --database a throwaway SQLite database is used. It is created and
+stamped by the first boot, so the later runs see an up to date schema, as a
+migrated production database would.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+# Run in a child process, prints imports + create_app in milliseconds
+BOOT = """
+import time
+started = time.perf_counter()
+import contextlib, io, sys
+sys.path.insert(0, {root!r})
+from volumx import create_app
+from volumx.config import Config
+with contextlib.redirect_stdout(io.StringIO()):
+    create_app(Config)
+print((time.perf_counter() - started) * 1000)
+"""
+
+
+def boot(env):
+    """imports + create_app in a fresh interpreter, in milliseconds"""
+    output = subprocess.run(
+        [sys.executable, "-c", BOOT.format(root=ROOT)], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def warm(runs):
+    """create_app alone in this process, in milliseconds per run"""
+    import contextlib
+    import io
+
+    sys.path.insert(0, ROOT)
+    from volumx import create_app
+    from volumx.config import Config
+
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            create_app(Config)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def summary(timings):
+    return f"median {statistics.median(timings):7.1f}  min {min(timings):7.1f}  max {max(timings):7.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--database", help="SQLALCHEMY_DATABASE_URI, a throwaway SQLite file by default")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="startup-")
+    os.environ["SQLALCHEMY_DATABASE_URI"] = args.database or f"sqlite:///{os.path.join(workdir, 'startup.db')}"
+    os.environ["SWAGGER_CACHE_DIR"] = workdir
+    os.environ.setdefault("JWT_SECRET_KEY", "startup-benchmark")
+    env = dict(os.environ)
+
+    print(f"first boot {boot(env):7.1f} ms")
+    print(f"cold       {summary([boot(env) for _ in range(args.runs)])} ms")
+    os.chdir(ROOT)
+    print(f"warm       {summary(warm(args.runs))} ms")
+
+
+if __name__ == "__main__":
+    main()
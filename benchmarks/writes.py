@@ -0,0 +1,124 @@
+"""
+Write latency of the business routes, committing per write or once per request.
+
+    python benchmarks/writes.py [--requests 300] [--rows 1000]
+
+Seeds an SQLite database (see common.seed_database), then sends --requests
+each of POST /api/v1/business/, PATCH /api/v1/business/<id> (business,
+contact and address fields) and DELETE /api/v1/business/<id> through the
+Flask test client, in two modes:
+  - per write: every model insert/update/delete commits on its own, as
+    before business_bp ran a unit of work
+  - unit of work: the request's writes are flushed and committed once by
+    finish_unit_of_work, the default
+Reported per route: mean and p99 latency in ms and commits per request.
+
+SQLite commits with a journal sync, so a commit costs roughly what a
+round trip plus fsync costs on a server database. Point --database at one
+(an SQLAlchemy URL, which is written to) to measure that directly.
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from unittest import mock
+
+from common import seed_database
+
+
+def business(i, user_id):
+    return {
+        "legalName": f"Write Legal {i}", "displayName": f"Write Display {i}", "websiteLink": "https://example.com",
+        "currency": "INR", "businessType": "retail", "businessGst": "GST", "businessPan": "PAN",
+        "businessLogo": "logo.png", "orderSystem": True, "email": f"write{i}@example.com", "phoneCode": 91,
+        "phoneNumber": 7000000000 + i, "fullAddress": "1 Main Road", "district": "District", "city": "City",
+        "country": "IN", "addressState": "State", "postalCode": "560001", "directions": "", "userId": user_id,
+        "productRights": True, "inventoryRights": True, "salesRights": True, "salesPosRights": True,
+        "suppliersRights": True, "analyticsViewRights": True, "ownerRights": True,
+    }
+
+
+def timed(client, commits, requests):
+    """Send (method, path, body) requests, returns latencies and commits per request"""
+    latencies = []
+    commits[0] = 0
+    for method, path, body in requests:
+        started = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        latencies.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {path}: {response.status_code} {response.get_json()}")
+    latencies.sort()
+    return {
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p99_ms": latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000,
+        "commits": commits[0] / len(latencies),
+    }
+
+
+def run(app, user_id, count, offset):
+    from sqlalchemy import event
+    from volumx import db
+
+    commits = [0]
+    with app.app_context():
+        event.listen(db.engine, "commit", lambda connection: commits.__setitem__(0, commits[0] + 1))
+    client = app.test_client()
+    results = {}
+    results["create"] = timed(client, commits, [
+        ("POST", "/api/v1/business/", business(offset + i, user_id)) for i in range(count)
+    ])
+    with app.app_context():
+        from volumx.models.business import Business
+        created = db.session.scalars(
+            db.select(Business.id).where(Business.legalName.like("Write Legal %")).order_by(Business.createdAt.desc()).limit(count)
+        ).all()
+        db.session.remove()
+    results["patch"] = timed(client, commits, [
+        ("PATCH", f"/api/v1/business/{business_id}", {"legalName": f"Patched {offset + i}", "email": f"patched{offset + i}@example.com", "city": "Pune"})
+        for i, business_id in enumerate(created)
+    ])
+    results["delete"] = timed(client, commits, [("DELETE", f"/api/v1/business/{business_id}", None) for business_id in created])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--database", default=None, help="SQLAlchemy URL of an existing, migrated database")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.database:
+        os.environ["SQLALCHEMY_DATABASE_URI"] = args.database
+    else:
+        database_path = os.path.join(tempfile.mkdtemp(prefix="writes-"), "writes.db")
+        seed_database(database_path, args.rows, seed=args.seed)
+
+    from volumx import create_app, db, db_utils
+    from volumx.config import Config
+    from volumx.models.user import User
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_app(type("BenchmarkConfig", (Config,), {"CACHE_TYPE": "NullCache"}))
+    with app.app_context():
+        user_id = db.session.scalars(db.select(User.id).limit(1)).one()
+
+    modes = {}
+    # Outside a unit of work every commit_or_flush commits
+    with mock.patch.object(db_utils, "in_unit_of_work", lambda: False):
+        modes["per write"] = run(app, user_id, args.requests, 0)
+    modes["unit of work"] = run(app, user_id, args.requests, args.requests)
+
+    print(f"{args.requests} requests per route")
+    print(f"  {'':22s} {'mean ms':>8s} {'p99 ms':>8s} {'commits':>8s}")
+    for mode, results in modes.items():
+        for route, stats in results.items():
+            print(f"  {mode + ' ' + route:22s} {stats['mean_ms']:8.2f} {stats['p99_ms']:8.2f} {stats['commits']:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Gunicorn settings, used with `gunicorn -c gunicorn.conf.py run:app`.
+
+Every setting can be overridden from the environment:
+
+    GUNICORN_WORKER_CLASS  sync, gthread (default) or gevent
+    GUNICORN_WORKERS       worker processes, sized from the CPU count by default
+    GUNICORN_THREADS       threads per gthread worker
+    GUNICORN_WORKER_CONNECTIONS  concurrent requests per gevent worker
+    GUNICORN_TIMEOUT, GUNICORN_MAX_REQUESTS, GUNICORN_MAX_REQUESTS_JITTER
+
+gthread keeps a worker serving other requests while one waits on the
+database or a password hash. gevent needs `pip install gevent` (and
+psycogreen with PostgreSQL so psycopg2 yields to other greenlets).
+"""
+import multiprocessing
+import os
+
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+
+if worker_class == 'gevent':
+    # Patch before the app is preloaded, otherwise the master imports the
+    # app with blocking sockets and locks that the workers then inherit
+    from gevent import monkey
+    monkey.patch_all()
+    try:
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        pass
+
+cpus = multiprocessing.cpu_count()
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Sync workers handle one request each, so run the usual 2 * CPUs + 1.
+# Threaded and gevent workers overlap their own I/O waits, so one per CPU
+# (plus one to cover a worker being recycled) is enough.
+default_workers = 2 * cpus + 1 if worker_class == 'sync' else cpus + 1
+workers = int(os.environ.get('GUNICORN_WORKERS', default_workers))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Restart workers after a number of requests, with jitter so they don't all
+# restart at once, to bound memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# Import the app once in the master so workers fork with it loaded, which
+# saves boot time and memory
+preload_app = True
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', 'access_log.log')
+errorlog = os.environ.get('GUNICORN_ERROR_LOG', 'error_log.log')
+
+
+def post_fork(server, worker):
+    """Drop the database connections inherited from the master.
+
+    The master opened connections while creating the app. A socket shared by
+    two processes corrupts both sides, so each worker forgets the inherited
+    pool without closing it (that would close it for the master too) and
+    opens its own connections.
+    """
+    from volumx import db
+
+    app = server.app.wsgi()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
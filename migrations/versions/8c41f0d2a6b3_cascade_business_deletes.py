@@ -0,0 +1,62 @@
+"""cascade business deletes through foreign keys
+
+Revision ID: 8c41f0d2a6b3
+Revises: 
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41f0d2a6b3'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# (table, column, referred table) of every foreign key that should cascade
+FOREIGN_KEYS = [
+    ('contact', 'addressId', 'address'),
+    ('business', 'contactId', 'contact'),
+    ('business_user_rights', 'businessId', 'business'),
+    ('business_user_rights', 'userId', 'users'),
+]
+
+# Gives the unnamed foreign keys SQLite reflects a name batch mode can drop
+NAMING_CONVENTION = {
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s',
+}
+
+
+def _replace_foreign_keys(ondelete):
+    bind = op.get_bind()
+    is_sqlite = bind.dialect.name == 'sqlite'
+    if is_sqlite:
+        # Rebuilding a table in batch mode drops the old one, which must not
+        # fire the cascades or foreign key checks
+        op.execute('PRAGMA foreign_keys=OFF')
+
+    inspector = sa.inspect(bind)
+    for table, column, referred in FOREIGN_KEYS:
+        name = f'fk_{table}_{column}_{referred}'
+        existing = [
+            fk for fk in inspector.get_foreign_keys(table)
+            if fk['constrained_columns'] == [column]
+        ]
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            for fk in existing:
+                batch_op.drop_constraint(fk['name'] or name, type_='foreignkey')
+            batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+
+    if is_sqlite:
+        op.execute('PRAGMA foreign_keys=ON')
+
+
+def upgrade():
+    _replace_foreign_keys('CASCADE')
+
+
+def downgrade():
+    _replace_foreign_keys(None)
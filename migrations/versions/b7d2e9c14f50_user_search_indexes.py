@@ -0,0 +1,58 @@
+"""prefix search indexes on user email and names
+
+Revision ID: b7d2e9c14f50
+Revises: 8c41f0d2a6b3
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e9c14f50'
+down_revision = '8c41f0d2a6b3'
+branch_labels = None
+depends_on = None
+
+
+SEARCH_COLUMNS = ('email', 'first_name', 'last_name')
+
+USERS_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "id UNINDEXED, email, first_name, last_name, prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts (id, email, first_name, last_name) "
+    "VALUES (new.id, new.email, new.first_name, new.last_name); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN "
+    "DELETE FROM users_fts WHERE id = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF email, first_name, last_name ON users BEGIN "
+    "UPDATE users_fts SET email = new.email, first_name = new.first_name, last_name = new.last_name "
+    "WHERE id = old.id; END",
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for column in SEARCH_COLUMNS:
+        # text_pattern_ops makes the index usable for LIKE 'abc%' under any collation
+        opclass = ' text_pattern_ops' if dialect == 'postgresql' else ''
+        op.execute(f'CREATE INDEX ix_users_{column}_lower ON users (lower({column}){opclass})')
+
+    if dialect == 'sqlite':
+        for statement in USERS_FTS_DDL:
+            op.execute(statement)
+        op.execute(
+            'INSERT INTO users_fts (id, email, first_name, last_name) '
+            'SELECT id, email, first_name, last_name FROM users'
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        for trigger in ('users_fts_insert', 'users_fts_delete', 'users_fts_update'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS users_fts')
+
+    for column in SEARCH_COLUMNS:
+        op.drop_index(f'ix_users_{column}_lower', table_name='users')
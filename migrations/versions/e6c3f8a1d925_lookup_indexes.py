@@ -0,0 +1,43 @@
+"""indexes on foreign keys and the keyset pagination order
+
+Revision ID: e6c3f8a1d925
+Revises: d41a6c8e2b97
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6c3f8a1d925'
+down_revision = 'd41a6c8e2b97'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns). The business_user_rights primary key leads with
+# the id column, so it doesn't help lookups by business or user. users.email
+# is already covered by its unique constraint and ix_users_email_lower.
+INDEXES = [
+    ('ix_business_user_rights_businessId_userId', 'business_user_rights', ['businessId', 'userId']),
+    ('ix_business_user_rights_userId', 'business_user_rights', ['userId']),
+    ('ix_contact_addressId', 'contact', ['addressId']),
+    ('ix_business_contactId', 'business', ['contactId']),
+    ('ix_business_createdAt_id', 'business', ['createdAt', 'id']),
+    ('ix_users_createdAt_id', 'users', ['createdAt', 'id']),
+]
+
+
+def upgrade():
+    # CONCURRENTLY keeps the tables writable while PostgreSQL builds the
+    # indexes, and it can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,128 @@
+"""native uuid ids and foreign keys
+
+Revision ID: f27b4d9e0c68
+Revises: e6c3f8a1d925
+Create Date: 2026-10-18 17:00:00.000000
+
+Converts the hex string ids to uuid on PostgreSQL and to 16 byte blobs on
+SQLite. Both rewrite every table, holding an exclusive lock meanwhile.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'f27b4d9e0c68'
+down_revision = 'e6c3f8a1d925'
+branch_labels = None
+depends_on = None
+
+
+# (table, column, string type before this revision)
+ID_COLUMNS = [
+    ('address', 'id', sa.String(255)),
+    ('contact', 'id', sa.String(255)),
+    ('contact', 'addressId', sa.String(50)),
+    ('business', 'id', sa.String(255)),
+    ('business', 'contactId', sa.String()),
+    ('business_user_rights', 'id', sa.String(255)),
+    ('business_user_rights', 'businessId', sa.String(50)),
+    ('business_user_rights', 'userId', sa.String(50)),
+    ('users', 'id', sa.String(255)),
+]
+
+# (table, column, referred table), named as in 8c41f0d2a6b3
+FOREIGN_KEYS = [
+    ('contact', 'addressId', 'address'),
+    ('business', 'contactId', 'contact'),
+    ('business_user_rights', 'businessId', 'business'),
+    ('business_user_rights', 'userId', 'users'),
+]
+
+SEARCH_COLUMNS = ('email', 'first_name', 'last_name')
+
+# Rebuilding the users table on SQLite drops its triggers, and batch mode
+# can't reflect the lower() indexes, so both come back from b7d2e9c14f50
+USERS_FTS_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts (id, email, first_name, last_name) "
+    "VALUES (new.id, new.email, new.first_name, new.last_name); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN "
+    "DELETE FROM users_fts WHERE id = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF email, first_name, last_name ON users BEGIN "
+    "UPDATE users_fts SET email = new.email, first_name = new.first_name, last_name = new.last_name "
+    "WHERE id = old.id; END",
+]
+
+
+def _postgresql(to_uuid):
+    for table, column, referred in FOREIGN_KEYS:
+        op.drop_constraint(f'fk_{table}_{column}_{referred}', table, type_='foreignkey')
+    for table, column, string_type in ID_COLUMNS:
+        if to_uuid:
+            op.alter_column(table, column, type_=postgresql.UUID(), postgresql_using=f'"{column}"::uuid')
+        else:
+            op.alter_column(table, column, type_=string_type, postgresql_using=f'replace("{column}"::text, \'-\', \'\')')
+    for table, column, referred in FOREIGN_KEYS:
+        op.create_foreign_key(
+            f'fk_{table}_{column}_{referred}', table, referred, [column], ['id'], ondelete='CASCADE'
+        )
+
+
+def _sqlite_foreign_keys(state):
+    # The pragma is ignored inside a transaction
+    with op.get_context().autocommit_block():
+        op.execute(f'PRAGMA foreign_keys={state}')
+
+
+def _sqlite(to_blob):
+    # Rebuilding a table drops the old one, which must not fire the cascades
+    _sqlite_foreign_keys('OFF')
+
+    tables = {}
+    for table, column, string_type in ID_COLUMNS:
+        tables.setdefault(table, []).append((column, string_type))
+    for table, columns in tables.items():
+        # SQLite keeps a blob as is in a text column and the reverse, so the
+        # values are converted in place and the rebuild only fixes the types
+        for column, _ in columns:
+            if to_blob:
+                op.execute(f'UPDATE {table} SET "{column}" = unhex_id("{column}") WHERE typeof("{column}") = \'text\'')
+            else:
+                op.execute(f'UPDATE {table} SET "{column}" = lower(hex("{column}")) WHERE typeof("{column}") = \'blob\'')
+        with op.batch_alter_table(table, recreate='always') as batch_op:
+            for column, string_type in columns:
+                batch_op.alter_column(column, type_=sa.LargeBinary(16) if to_blob else string_type)
+
+    for column in SEARCH_COLUMNS:
+        op.execute(f'CREATE INDEX IF NOT EXISTS ix_users_{column}_lower ON users (lower({column}))')
+    if sa.inspect(op.get_bind()).has_table('users_fts'):
+        for statement in USERS_FTS_TRIGGERS:
+            op.execute(statement)
+        op.execute('DELETE FROM users_fts')
+        op.execute(
+            'INSERT INTO users_fts (id, email, first_name, last_name) '
+            'SELECT id, email, first_name, last_name FROM users'
+        )
+
+    _sqlite_foreign_keys('ON')
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        _postgresql(to_uuid=True)
+    elif bind.dialect.name == 'sqlite':
+        # unhex() only arrived in SQLite 3.41
+        bind.connection.driver_connection.create_function('unhex_id', 1, bytes.fromhex, deterministic=True)
+        _sqlite(to_blob=True)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        _postgresql(to_uuid=False)
+    elif bind.dialect.name == 'sqlite':
+        _sqlite(to_blob=False)
@@ -0,0 +1,127 @@
+"""
+Fixtures: an app on a throwaway SQLite database, seeded through the models'
+tables with enough rows that a full table scan shows up in query plans.
+"""
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, insert
+from uuid import uuid4
+from werkzeug.security import generate_password_hash
+import os
+import pytest
+
+
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key-for-the-test-suite")
+
+from volumx import create_app, db
+from volumx.config import Config
+from volumx.models.business import Address, Business, BusinessUserRights, Contact
+from volumx.models.user import User
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+# Rows per table in the seeded database
+SEED_ROWS = 2000
+
+PASSWORD = "secret"
+
+
+def make_app(database_path, **settings):
+    """The app on an SQLite file, with any config overrides"""
+    config = type("TestConfig", (Config,), {
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{database_path}",
+        "SWAGGER_CACHE_DIR": os.path.dirname(database_path),
+        "PASSWORD_HASH_METHOD": "pbkdf2:sha256:1000",
+        "PASSWORD_HASH_WORKERS": 0,
+        "QUERY_STATS_LOG_LEVEL": "WARNING",
+        **settings,
+    })
+    # The Swagger spec is loaded relative to the working directory
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        return create_app(config)
+    finally:
+        os.chdir(cwd)
+
+
+def seed(rows):
+    """Insert rows users, each owning a business with its contact and address.
+
+    Returns:
+        dict: the ids of the first user (an admin) and business, the first
+        user's email and the id of the last business, for tests deleting one
+    """
+    started = datetime(2026, 1, 1)
+    password = generate_password_hash(PASSWORD, "pbkdf2:sha256:1000")
+    users, addresses, contacts, businesses, rights = [], [], [], [], []
+    for i in range(rows):
+        created = {"createdAt": started + timedelta(seconds=i), "updatedAt": started + timedelta(seconds=i)}
+        user_id, address_id, contact_id, business_id = (uuid4().hex for _ in range(4))
+        users.append({
+            "id": user_id, "email": f"user{i}@example.com", "first_name": f"First{i}", "last_name": f"Last{i}",
+            "password": password, "is_admin": i == 0, **created,
+        })
+        addresses.append({
+            "id": address_id, "fullAddress": f"{i} Main Road", "district": "District", "city": "City",
+            "country": "IN", "addressState": "State", "postalCode": "560001", "directions": "", **created,
+        })
+        contacts.append({
+            "id": contact_id, "email": f"business{i}@example.com", "phoneCode": 91, "phoneNumber": 9000000000 + i,
+            "addressId": address_id, **created,
+        })
+        businesses.append({
+            "id": business_id, "legalName": f"Legal {i}", "displayName": f"Display {i}", "websiteLink": "https://example.com",
+            "currency": "INR", "businessType": "retail", "businessGst": "GST", "businessPan": "PAN",
+            "businessLogo": "logo.png", "orderSystem": True, "contactId": contact_id, **created,
+        })
+        rights.append({
+            "id": uuid4().hex, "businessId": business_id, "userId": user_id, "productRights": True,
+            "inventoryRights": True, "salesRights": True, "salesPosRights": True, "suppliersRights": True,
+            "analyticsViewRights": True, "ownerRights": True, **created,
+        })
+    for model, model_rows in ((User, users), (Address, addresses), (Contact, contacts), (Business, businesses), (BusinessUserRights, rights)):
+        db.session.execute(insert(model), model_rows)
+    db.session.commit()
+    # Give the planner row counts, as a long running database would have
+    db.session.connection().exec_driver_sql("ANALYZE")
+    db.session.commit()
+    return {
+        "user_id": users[0]["id"], "business_id": businesses[0]["id"], "email": users[0]["email"],
+        "spare_business_id": businesses[-1]["id"],
+    }
+
+
+class StatementRecorder:
+    """Collects the statements an engine runs, with their parameters"""
+
+    def __init__(self, engine):
+        self.statements = []
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    def clear(self):
+        self.statements.clear()
+
+
+@pytest.fixture(scope="session")
+def seeded(tmp_path_factory):
+    """App on a seeded database shared by the tests, which only read from it"""
+    database_path = str(tmp_path_factory.mktemp("seeded") / "test.db")
+    app = make_app(database_path)
+    with app.app_context():
+        ids = seed(SEED_ROWS)
+        token = create_access_token(identity=ids["user_id"])
+        recorder = StatementRecorder(db.engine)
+    return {
+        "app": app,
+        "client": app.test_client(),
+        "headers": {"Authorization": f"Bearer {token}"},
+        "database_path": database_path,
+        "recorder": recorder,
+        **ids,
+    }
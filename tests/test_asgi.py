@@ -0,0 +1,73 @@
+"""
+The optional ASGI mode answers like the Flask routes, status and body, on
+the seeded database. Skipped without the packages in requirements-asgi.txt.
+"""
+from uuid import UUID
+import asyncio
+import pytest
+
+pytest.importorskip("starlette")
+pytest.importorskip("a2wsgi")
+pytest.importorskip("aiosqlite")
+
+from volumx.asgi import create_asgi_app
+
+
+@pytest.fixture(scope="module")
+def asgi_app(seeded):
+    app = create_asgi_app(seeded["app"])
+    yield app
+    # Startup then shutdown, which disposes of the async engine's connections
+    events = iter([{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
+
+    async def receive():
+        return next(events)
+
+    async def send(message):
+        pass
+
+    asyncio.run(app({"type": "lifespan", "asgi": {"version": "3.0"}}, receive, send))
+
+
+def asgi_get(app, path):
+    """GET path from the ASGI app, returns (status, body)"""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": query.encode(),
+        "headers": [(b"host", b"localhost")], "server": ("localhost", 80), "client": ("127.0.0.1", 50000),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return messages[0]["status"], b"".join(message.get("body", b"") for message in messages[1:])
+
+
+@pytest.mark.parametrize("path", [
+    "/api/v1/business/{business_id}",
+    "/api/v1/business/{business_id}?fields=legalName,contact.address.city",
+    "/api/v1/business/{hyphenated_business_id}",
+    "/api/v1/business/?limit=5",
+    "/api/v1/business/?limit=5&fields=nope",
+    "/api/v1/business/{business_id}/user_rights",
+    "/api/v1/business/user_rights/{user_id}",
+    "/api/v1/business/user_rights/{hyphenated_user_id}",
+    # not UUIDs
+    "/api/v1/business/not-a-uuid",
+    "/api/v1/business/not-a-uuid/user_rights",
+    "/api/v1/business/user_rights/not-a-uuid",
+    # a static path the async routes don't serve, 405 for GET
+    "/api/v1/business/bulk",
+])
+def test_asgi_answers_like_flask(seeded, asgi_app, path):
+    path = path.format(
+        hyphenated_business_id=UUID(seeded["business_id"]), hyphenated_user_id=UUID(seeded["user_id"]), **seeded,
+    )
+    expected = seeded["client"].get(path)
+    assert asgi_get(asgi_app, path) == (expected.status_code, expected.data)
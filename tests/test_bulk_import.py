@@ -0,0 +1,52 @@
+"""
+POST /api/v1/business/bulk against a small database of its own, as the
+route writes.
+"""
+from uuid import UUID
+import pytest
+
+from conftest import make_app, seed
+from volumx import db
+from volumx.models.business import BusinessUserRights
+
+
+def business(i, user_id):
+    return {
+        "legalName": f"Bulk Legal {i}", "displayName": f"Bulk Display {i}", "websiteLink": "https://example.com",
+        "currency": "INR", "businessType": "retail", "businessGst": "GST", "businessPan": "PAN",
+        "businessLogo": "logo.png", "orderSystem": True, "email": f"bulk{i}@example.com", "phoneCode": 91,
+        "phoneNumber": 8000000000 + i, "fullAddress": "1 Main Road", "district": "District", "city": "City",
+        "country": "IN", "addressState": "State", "postalCode": "560001", "directions": "", "userId": user_id,
+        "productRights": True, "inventoryRights": True, "salesRights": True, "salesPosRights": True,
+        "suppliersRights": True, "analyticsViewRights": True, "ownerRights": True,
+    }
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(str(tmp_path / "test.db"))
+    with app.app_context():
+        app.ids = seed(5)
+    return app
+
+
+@pytest.mark.parametrize("spelling", [str, lambda value: str(value).upper(), lambda value: value.hex],
+                         ids=["hyphenated", "upper case", "hex"])
+def test_bulk_create_accepts_any_user_id_spelling(app, spelling):
+    user_id = spelling(UUID(app.ids["user_id"]))
+    response = app.test_client().post("/api/v1/business/bulk", json=[business(0, user_id)])
+    assert response.status_code == 201, response.get_json()
+    business_id = response.get_json()["results"][0]["businessId"]
+    with app.app_context():
+        rights = db.session.scalars(db.select(BusinessUserRights).filter_by(businessId=business_id)).one()
+        assert rights.userId == app.ids["user_id"]
+
+
+def test_bulk_create_reports_unknown_users(app):
+    response = app.test_client().post("/api/v1/business/bulk", json=[
+        business(0, app.ids["user_id"]), business(1, str(UUID(int=1))),
+    ])
+    assert response.status_code == 207
+    results = response.get_json()["results"]
+    assert results[0]["status"] == "created"
+    assert results[1]["errors"] == [{"field": "userId", "error": "User not found"}]
@@ -0,0 +1,46 @@
+"""
+PATCH /api/v1/business/user_rights reports the rows it changed.
+"""
+from sqlalchemy import insert
+from uuid import uuid4
+import pytest
+
+from conftest import make_app, seed
+from volumx import db
+from volumx.models.business import BusinessUserRights
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(str(tmp_path / "test.db"))
+    with app.app_context():
+        app.ids = seed(3)
+        # A second rights row for the same business and user
+        db.session.execute(insert(BusinessUserRights), [{
+            "id": uuid4().hex, "businessId": app.ids["business_id"], "userId": app.ids["user_id"],
+            "productRights": True, "inventoryRights": True, "salesRights": True, "salesPosRights": True,
+            "suppliersRights": True, "analyticsViewRights": True, "ownerRights": True,
+        }])
+        db.session.commit()
+    return app
+
+
+def test_filter_counts_every_row(app):
+    response = app.test_client().patch("/api/v1/business/user_rights", json={
+        "filter": {"businessId": app.ids["business_id"]}, "rights": {"salesRights": False},
+    })
+    assert response.status_code == 200
+    assert response.get_json()["updated"] == 2
+
+
+def test_changes_count_each_row_once(app):
+    pair = {"businessId": app.ids["business_id"], "userId": app.ids["user_id"]}
+    response = app.test_client().patch("/api/v1/business/user_rights", json={"changes": [
+        {**pair, "salesRights": False},
+        {**pair, "ownerRights": False},
+        {"businessId": app.ids["spare_business_id"], "userId": app.ids["user_id"], "salesRights": False},
+    ]})
+    assert response.status_code == 200
+    # Two statements touch the same two rows, the third change matches none
+    assert response.get_json()["updated"] == 2
+    assert response.get_json()["statements"] == 2
@@ -0,0 +1,55 @@
+"""
+Deleting businesses removes the whole tree, also where a business has no
+contact or its contact has no address.
+"""
+from sqlalchemy import func, update
+import pytest
+
+from conftest import make_app, seed
+from volumx import db
+from volumx.models.business import Address, Business, BusinessUserRights, Contact
+
+
+def counts():
+    return {model.__name__: db.session.scalar(db.select(func.count()).select_from(model))
+            for model in (Address, Contact, Business, BusinessUserRights)}
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(str(tmp_path / "test.db"))
+    with app.app_context():
+        seed(4)
+        business_ids = db.session.scalars(db.select(Business.id).order_by(Business.createdAt)).all()
+        # The second business's contact lost its address, the third business its contact
+        contact_id = db.session.scalar(db.select(Business.contactId).where(Business.id == business_ids[1]))
+        db.session.execute(update(Contact).where(Contact.id == contact_id).values(addressId=None))
+        db.session.execute(update(Business).where(Business.id == business_ids[2]).values(contactId=None))
+        db.session.commit()
+    app.business_ids = business_ids
+    return app
+
+
+def test_bulk_delete_removes_every_tree(app):
+    response = app.test_client().delete("/api/v1/business/bulk", json={"ids": app.business_ids[:3]})
+    assert response.status_code == 200
+    assert response.get_json()["deleted"] == 3
+    with app.app_context():
+        # The contactless business's contact and the addressless contact's
+        # old address were already loose before the delete
+        assert counts() == {"Address": 3, "Contact": 2, "Business": 1, "BusinessUserRights": 1}
+
+
+@pytest.mark.parametrize("index", [0, 1, 2])
+def test_delete_removes_the_tree(app, index):
+    with app.app_context():
+        before = counts()
+    response = app.test_client().delete(f"/api/v1/business/{app.business_ids[index]}")
+    assert response.status_code == 200
+    with app.app_context():
+        after = counts()
+    assert before["Business"] - after["Business"] == 1
+    assert before["BusinessUserRights"] - after["BusinessUserRights"] == 1
+    # The contact goes with its business, and the address with its contact
+    assert before["Contact"] - after["Contact"] == (0 if index == 2 else 1)
+    assert before["Address"] - after["Address"] == (1 if index == 0 else 0)
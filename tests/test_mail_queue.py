@@ -0,0 +1,93 @@
+"""
+Mail goes out from the queue's sender thread, through an SMTP stand-in on
+localhost, while the request that queued it has already answered.
+"""
+from flask_jwt_extended import create_access_token
+import atexit
+import socketserver
+import threading
+import pytest
+
+from conftest import make_app, seed
+from volumx import mail_queue
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Just enough SMTP for smtplib, holding each DATA reply until release is set"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.messages = []
+        self.receiving = threading.Event()
+        self.release = threading.Event()
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.reply("220 stand-in")
+        for line in self.rfile:
+            command = line.decode().strip().upper()
+            if command.startswith("EHLO"):
+                self.reply("250-stand-in")
+                self.reply("250 8BITMIME")
+            elif command == "DATA":
+                self.reply("354 go ahead")
+                body = []
+                for data in self.rfile:
+                    if data.rstrip(b"\r\n") == b".":
+                        break
+                    body.append(data.decode())
+                self.server.receiving.set()
+                self.server.release.wait(10)
+                self.server.messages.append("".join(body))
+                self.reply("250 queued")
+            elif command == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")
+
+
+@pytest.fixture
+def smtp():
+    server = SMTPStandIn()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+def test_mail_is_sent_off_the_request_thread(tmp_path, smtp):
+    app = make_app(
+        str(tmp_path / "test.db"), MAIL_SERVER="127.0.0.1", MAIL_PORT=smtp.server_address[1],
+        MAIL_USE_TLS=False, MAIL_USE_SSL=False, MAIL_USERNAME=None, MAIL_SUPPRESS_SEND=False,
+    )
+    with app.app_context():
+        ids = seed(1)
+        token = create_access_token(identity=ids["user_id"])
+
+    response = app.test_client().post("/api/v1/auth/email/otp", headers={"Authorization": f"Bearer {token}"})
+    # Answered while the SMTP server still holds the message
+    assert response.status_code == 202
+    assert smtp.receiving.wait(10)
+    assert smtp.messages == []
+
+    smtp.release.set()
+    assert mail_queue.flush(10)
+    assert len(smtp.messages) == 1
+    assert "Your verification code is" in smtp.messages[0]
+
+
+def test_init_app_does_not_register_exit_handlers(tmp_path, monkeypatch):
+    registered = []
+    monkeypatch.setattr(atexit, "register", registered.append)
+    make_app(str(tmp_path / "one.db"))
+    make_app(str(tmp_path / "two.db"))
+    assert registered == []
@@ -0,0 +1,66 @@
+"""
+Queries per request, as counted by volumx.query_stats in the Server-Timing
+header. A route that starts loading rows one by one fails here, and with
+TESTING on the N+1 detector fails it as well.
+"""
+from sqlalchemy import event
+import pytest
+import re
+
+from conftest import make_app, seed
+from volumx import db
+from volumx.business.routes import business_query
+
+
+def query_count(response):
+    return int(re.search(r'db;desc="(\d+) queries"', response.headers["Server-Timing"]).group(1))
+
+
+@pytest.mark.parametrize("path, queries", [
+    # Each count includes the conditional GET validator
+    ("/api/v1/business/{business_id}", 2),
+    ("/api/v1/business/?limit=50", 2),
+    ("/api/v1/business/?limit=500", 2),
+    ("/api/v1/business/?limit=50&fields=legalName,contact.address.city", 2),
+    ("/api/v1/business/{business_id}/user_rights", 3),
+    ("/api/v1/business/user_rights/{user_id}", 3),
+    ("/api/v1/business/user_rights", 2),
+    ("/api/v1/auth/users?limit=50", 3),
+    ("/api/v1/auth/users/{user_id}", 2),
+])
+def test_route_query_count(seeded, path, queries):
+    response = seeded["client"].get(path.format(**seeded))
+    assert response.status_code == 200
+    assert query_count(response) == queries
+
+
+@pytest.mark.parametrize("path", [
+    "/api/v1/business/{business_id}",
+    "/api/v1/business/?limit=50",
+    "/api/v1/business/user_rights/{user_id}",
+    "/api/v1/auth/users/{user_id}",
+])
+def test_not_modified_only_runs_the_validator(seeded, path):
+    path = path.format(**seeded)
+    etag = seeded["client"].get(path).headers["ETag"]
+    response = seeded["client"].get(path, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert query_count(response) == 1
+
+
+@pytest.mark.parametrize("strategy, queries", [
+    ("joined", 1),
+    ("selectin", 3),
+    ("subquery", 3),
+])
+def test_business_loader_strategies(tmp_path, strategy, queries):
+    app = make_app(str(tmp_path / "test.db"), BUSINESS_LOADER_STRATEGY=strategy)
+    statements = []
+    with app.app_context():
+        seed(20)
+        event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        db.session.expire_all()
+        businesses = business_query().all()
+        assert {business.contact.address.city for business in businesses} == {"City"}
+    assert len(businesses) == 20
+    assert len(statements) == queries
@@ -0,0 +1,107 @@
+"""
+EXPLAIN QUERY PLAN regression tests.
+
+Every statement a route runs against the seeded database is explained, and
+the test fails when one scans a whole table. Walking an index in order under
+a LIMIT (the first keyset page) is fine, searching an index is fine, anything
+else that reads every row needs an entry in WHOLE_TABLE_READS.
+"""
+import pytest
+import re
+import sqlite3
+
+
+TABLES = {"users", "business", "contact", "address", "business_user_rights"}
+
+_SCAN = re.compile(r"SCAN (\w+)(?: USING (COVERING )?INDEX \w+)?$")
+
+# The count and newest updatedAt of all users, see volumx.auth.user_marker
+USERS_VALIDATOR = r'^SELECT count\(users\.id\) AS count_1, max\(users\."updatedAt"\) AS max_1 FROM users$'
+
+# Statements reading a whole table by design: route -> (table, pattern
+# matching the statement). The route's other statements are still checked
+WHOLE_TABLE_READS = {
+    # every rights row is returned
+    "/api/v1/business/user_rights": [("business_user_rights", r"^SELECT .* FROM business_user_rights$")],
+    # every business is streamed
+    "/api/v1/business/export": [("business", r"^SELECT .* FROM business LEFT OUTER JOIN contact")],
+    # the total_users count, and the conditional GET validator
+    "/api/v1/auth/users": [
+        ("users", r"^SELECT count\(users\.id\) AS count_1 FROM users$"),
+        ("users", USERS_VALIDATOR),
+    ],
+    "/api/v1/auth/users/search": [("users", USERS_VALIDATOR)],
+    # the conditional GET validator of the list
+    "/api/v1/business": [("business", r'^SELECT count\(business\.id\) AS count_1, max\(business\."updatedAt"\)')],
+}
+
+
+def allowed(path, scan):
+    table, _, statement = scan
+    return any(
+        table == allowed_table and re.search(pattern, statement)
+        for allowed_table, pattern in WHOLE_TABLE_READS.get(path.split("?")[0].rstrip("/"), [])
+    )
+
+
+def full_scans(database_path, statements):
+    """(table, plan detail, statement) of the plan steps reading a whole table"""
+    scans = []
+    with sqlite3.connect(database_path) as connection:
+        for statement, parameters in statements:
+            if statement.lstrip().upper().startswith(("INSERT", "PRAGMA", "ANALYZE")):
+                continue
+            for row in connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters):
+                detail = row[3]
+                match = _SCAN.match(detail)
+                if not match or match.group(1) not in TABLES:
+                    continue
+                ordered_walk = "USING INDEX" in detail and re.search(r"\bLIMIT\b", statement)
+                if not ordered_walk:
+                    scans.append((match.group(1), detail, " ".join(statement.split())))
+    return scans
+
+
+def request_plans(seeded, method, path, **kwargs):
+    """Run a request and return the whole table scans of its statements"""
+    seeded["recorder"].clear()
+    response = seeded["client"].open(path, method=method, headers=seeded["headers"], **kwargs)
+    response.get_data()
+    assert response.status_code < 400, response.get_data(as_text=True)
+    scans = full_scans(seeded["database_path"], seeded["recorder"].statements)
+    return response, [scan for scan in scans if not allowed(path, scan)]
+
+
+@pytest.mark.parametrize("path", [
+    "/api/v1/business/{business_id}",
+    "/api/v1/business/?limit=50",
+    "/api/v1/business/?limit=50&fields=legalName,contact.email",
+    "/api/v1/business/export",
+    "/api/v1/business/{business_id}/user_rights",
+    "/api/v1/business/user_rights/{user_id}",
+    "/api/v1/business/user_rights",
+    "/api/v1/auth/users?limit=50",
+    "/api/v1/auth/users/search?q=user12",
+    "/api/v1/auth/users/{user_id}",
+])
+def test_read_routes_use_indexes(seeded, path):
+    _, scans = request_plans(seeded, "GET", path.format(**seeded))
+    assert not scans
+
+
+@pytest.mark.parametrize("path", ["/api/v1/business/?limit=50", "/api/v1/auth/users?limit=50"])
+def test_next_keyset_page_uses_indexes(seeded, path):
+    response, _ = request_plans(seeded, "GET", path)
+    cursor = response.headers["X-Next-Cursor"]
+    _, scans = request_plans(seeded, "GET", f"{path}&cursor={cursor}")
+    assert not scans
+
+
+def test_login_uses_indexes(seeded):
+    _, scans = request_plans(seeded, "POST", "/api/v1/auth/login", json={"email": seeded["email"], "password": "secret"})
+    assert not scans
+
+
+def test_delete_business_uses_indexes(seeded):
+    _, scans = request_plans(seeded, "DELETE", f"/api/v1/business/{seeded['spare_business_id']}")
+    assert not scans
@@ -0,0 +1,18 @@
+"""
+The per-worker metrics routes are for admins only.
+"""
+from flask_jwt_extended import create_access_token
+import pytest
+
+from volumx.models.user import User
+
+
+@pytest.mark.parametrize("path", ["/cache/stats", "/db/pool"])
+def test_metrics_need_an_admin(seeded, path):
+    client = seeded["client"]
+    assert client.get(path).status_code == 401
+    with seeded["app"].app_context():
+        user_id = User.query.filter_by(email="user1@example.com").one().id
+        token = create_access_token(identity=user_id)
+    assert client.get(path, headers={"Authorization": f"Bearer {token}"}).status_code == 401
+    assert client.get(path, headers=seeded["headers"]).status_code == 200
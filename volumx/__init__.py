@@ -1,15 +1,17 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask import Flask, jsonify
-from sqlalchemy.exc import OperationalError
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
 from volumx.config import Config
 #from med_app.config import App_Config
 from flasgger import Swagger
 from flask_caching import Cache
-import yaml
 import os
 from flask_mail import Mail
 from flask_jwt_extended import JWTManager
+from volumx.mail_queue import MailQueue
+from volumx.db_routing import RoutingSession
 
 # # Create instances of Flask extensions
 # app = Flask(__name__)
@@ -17,7 +19,8 @@ from flask_jwt_extended import JWTManager
 # if app.config["SQLALCHEMY_DATABASE_URI"]:
 #         print("using db")
 
-db = SQLAlchemy()
+# GET requests read from the replicas in DB_REPLICA_URLS, if there are any
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 
 # Create an instance of Swagger
@@ -29,6 +32,9 @@ cache = Cache()
 
 mail = Mail()  # Create the mail object
 
+# Sends mail from a background thread so requests don't wait on SMTP
+mail_queue = MailQueue(mail)
+
 def create_app(config):
     app = Flask(__name__)
     app.config.from_object(config)
@@ -37,6 +43,12 @@ def create_app(config):
         print("using db")
 
 
+    # Client address and scheme from the X-Forwarded-* headers of trusted proxies
+    if app.config.get("TRUSTED_PROXIES"):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        proxies = app.config["TRUSTED_PROXIES"]
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
+
     # Initialize CORS
     CORS(app, supports_credentials=True)
 
@@ -44,28 +56,49 @@ def create_app(config):
     def handle_db_connection_error(e):
         return jsonify({"error": "Database connection error", "message": str(e)}), 500
 
+    # Every pooled connection stayed busy for DB_POOL_TIMEOUT seconds
+    @app.errorhandler(PoolTimeoutError)
+    def handle_db_pool_timeout(e):
+        return jsonify({"error": "Database busy", "message": "Please try again"}), 503, {"Retry-After": "1"}
 
-    # Load Swagger content from the file
-    with open("swagger_config.yaml", "r") as file:
-        swagger_config = yaml.load(file, Loader=yaml.FullLoader)
+
+    # Load Swagger content from the file, through the compiled JSON cache
+    from volumx.swagger_cache import load_swagger_template
+    swagger_config = load_swagger_template(
+        "swagger_config.yaml", app.config.get("SWAGGER_CACHE_DIR") or app.instance_path
+    )
     # Initialize Flasgger with the loaded Swagger configuration
     Swagger(app, template=swagger_config)
 
     #initialize the caching system
     cache.init_app(app)
 
-    # Initialize SQLAlchemy
+    # Initialize SQLAlchemy, with the pool sized from the DB_POOL_* settings
+    from volumx.db_pool import engine_options
+    from volumx.db_routing import replica_binds, replica_router
+    if "SQLALCHEMY_ENGINE_OPTIONS" not in app.config:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
+    app.config["SQLALCHEMY_BINDS"] = {**app.config.get("SQLALCHEMY_BINDS", {}), **replica_binds(app.config)}
     db.init_app(app)
+    replica_router.init_app(app, db)
+    # Query count and database time per request, see volumx.query_stats
+    from volumx.query_stats import init_query_stats
+    init_query_stats(app, db)
+    from volumx.db_utils import enable_sqlite_foreign_keys
+    with app.app_context():
+        event.listen(db.engine, "connect", enable_sqlite_foreign_keys)
 
     # Secret key
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
     # Flask-Mail
-    app.config['MAIL_SERVER'] = 'smtp.googlemail.com'
-    app.config['MAIL_PORT'] = 587 # 465
-    app.config['MAIL_USE_TLS'] = True # False
-    app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
-    app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
-    app.config['MAIL_DEFAULT_SENDER'] = 'your-email@example.com'
+    # (defaults, so a config object can point at another server, e.g. a
+    # local SMTP stand-in in tests)
+    app.config.setdefault('MAIL_SERVER', 'smtp.googlemail.com')
+    app.config.setdefault('MAIL_PORT', 587) # 465
+    app.config.setdefault('MAIL_USE_TLS', True) # False
+    app.config.setdefault('MAIL_USERNAME', os.getenv('MAIL_USERNAME'))
+    app.config.setdefault('MAIL_PASSWORD', os.getenv('MAIL_PASSWORD'))
+    app.config.setdefault('MAIL_DEFAULT_SENDER', 'your-email@example.com')
 
     # JWT
     app.config['ACCESS_SECRET_KEY'] = os.getenv('ACCESS_SECRET_KEY')
@@ -76,9 +109,18 @@ def create_app(config):
 
     jwt = JWTManager(app)  # Instantiate the JWTManager class
 
+    # Refuse tokens revoked by logout
+    from volumx.token_blocklist import token_blocklist
+    jwt.token_in_blocklist_loader(token_blocklist.is_revoked)
+
 
     # Initialize Flask-Mail
     mail.init_app(app)  # Initialize Flask-Mail with your app
+    mail_queue.init_app(app)
+
+    # Ids in URLs, e.g. /<hex_uuid:business_id>, in their canonical form
+    from volumx.models.base import HexUUIDConverter
+    app.url_map.converters['hex_uuid'] = HexUUIDConverter
 
     # imports blueprints
     from volumx.business.routes import business_bp
@@ -91,8 +133,8 @@ def create_app(config):
     app.register_blueprint(business_bp)
     app.register_blueprint(util_bp)
 
-    # create db tables from models if not exists
-    with app.app_context():
-        db.create_all()
+    # Check the database is migrated instead of running create_all
+    from volumx.db_utils import check_schema_version
+    check_schema_version(app, app.config.get("MIGRATIONS_DIR"))
 
     return app
\ No newline at end of file
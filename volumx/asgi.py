@@ -0,0 +1,183 @@
+"""
+Optional ASGI serving mode.
+
+The business read routes are served by async handlers on an AsyncSession,
+so one process can keep hundreds of requests waiting on the database
+instead of holding a thread or worker per request. Every other request is
+handed to the Flask app, run in a thread pool, so the URL surface is the
+same as the WSGI deployment. The handlers use the same models and
+serializers as the Flask routes.
+
+Needs the packages in requirements-asgi.txt. Run with `uvicorn asgi:app`.
+"""
+from a2wsgi import WSGIMiddleware
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from contextlib import asynccontextmanager
+from uuid import UUID
+from volumx import db
+from volumx.db_pool import engine_options
+from volumx.db_utils import keyset_page, keyset_rows
+from volumx.models.business import Business, BusinessUserRights
+from volumx.models.user import User
+from volumx.serializers import serializer_for
+
+
+# Async driver used in place of each sync database driver
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def async_database_url(url):
+    """The database URL rewritten for the matching async driver.
+
+    Raises:
+        ValueError: if there is no async driver for the database
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver for {backend}")
+    url = url.set(drivername=ASYNC_DRIVERS[backend])
+    if "sslmode" in url.query:
+        # asyncpg calls libpq's sslmode "ssl"
+        sslmode = url.query["sslmode"]
+        url = url.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+    return url
+
+
+def create_asgi_app(flask_app):
+    """Wrap a Flask app created by create_app in the async app.
+
+    Args:
+        flask_app: the Flask app, also the source of config and database URL
+    """
+    config = flask_app.config
+    with flask_app.app_context():
+        url = async_database_url(db.engine.url)
+
+    # Same pool settings as the sync engine, on a queue pool even where the
+    # async driver defaults to NullPool (aiosqlite)
+    options = engine_options(config, url)
+    if "poolclass" in options:
+        options["poolclass"] = AsyncAdaptedQueuePool
+    if options.pop("connect_args", None):
+        options["connect_args"] = {"server_settings": {"statement_timeout": str(config["DB_STATEMENT_TIMEOUT"])}}
+    engine = create_async_engine(url, **options)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    flask_asgi = WSGIMiddleware(flask_app, workers=config.get("ASGI_WSGI_THREADS", 10))
+
+    # Format bodies like Flask's jsonify, so both modes answer byte for byte alike
+    if flask_app.json.compact is False or (flask_app.json.compact is None and flask_app.debug):
+        dump_args = {"indent": 2}
+    else:
+        dump_args = {"separators": (",", ":")}
+
+    def json_response(data, status_code=200, headers=None):
+        body = flask_app.json.dumps(data, **dump_args) + "\n"
+        return Response(body, status_code, headers, media_type="application/json")
+
+    async def fetch(statement):
+        async with Session() as session:
+            return (await session.execute(statement)).all()
+
+    def page_args(request):
+        limit = request.query_params.get("limit", "")
+        limit = int(limit) if limit.isdigit() else config.get("PAGINATION_DEFAULT_LIMIT", 50)
+        limit = max(1, min(limit, config.get("PAGINATION_MAX_LIMIT", 500)))
+        return limit, request.query_params.get("cursor")
+
+    def next_page_headers(request, next_cursor, limit):
+        if not next_cursor:
+            return {}
+        next_url = request.url.include_query_params(cursor=next_cursor, limit=limit)
+        return {"Link": f'<{next_url}>; rel="next"', "X-Next-Cursor": next_cursor}
+
+    def uuid_path(handler):
+        """Canonicalize the path's ids like the hex_uuid converter. A path
+        whose id isn't a UUID goes to Flask, so it answers as it would
+        anyway: a 404, or a 405 for a static path such as /bulk."""
+        async def endpoint(request):
+            try:
+                request.path_params.update({name: UUID(value).hex for name, value in request.path_params.items()})
+            except ValueError:
+                return flask_asgi
+            return await handler(request)
+        return endpoint
+
+    async def get_business_data(request):
+        try:
+            serializer = serializer_for("business", request.query_params.get("fields"))
+        except ValueError as e:
+            return json_response({"error": str(e)}, 400)
+        rows = await fetch(serializer.select().filter(Business.id == request.path_params["business_id"]).limit(1))
+        if not rows:
+            return json_response({"error": "Business not found"}, 404)
+        return json_response(serializer.to_dict(rows[0]))
+
+    async def get_all_business_data(request):
+        # The NDJSON export streams from a server side cursor in Flask
+        if request.headers.get("accept", "").startswith(NDJSON_MIMETYPE):
+            return flask_asgi
+        limit, cursor = page_args(request)
+        try:
+            serializer = serializer_for("business", request.query_params.get("fields"))
+            statement = keyset_page(serializer.select(), Business, limit, cursor)
+        except ValueError as e:
+            return json_response({"error": str(e)}, 400)
+        businesses, next_cursor = keyset_rows(await fetch(statement), limit)
+        if not businesses:
+            return json_response({"error": "Businesses not found", "businessesData": []}, 404)
+        return json_response(serializer.to_list(businesses), headers=next_page_headers(request, next_cursor, limit))
+
+    async def user_rights_response(statement):
+        rows = await fetch(statement)
+        if not rows:
+            return json_response({"error": "Business user rights not found"}, 404)
+        return json_response(serializer_for("business_user_rights").to_list(rows))
+
+    async def get_business_user_rights(request):
+        user_id = request.path_params["user_id"]
+        if not await fetch(select(User.id).filter(User.id == user_id)):
+            return json_response({"error": "User not found"}, 404)
+        serializer = serializer_for("business_user_rights")
+        return await user_rights_response(serializer.select().filter(BusinessUserRights.userId == user_id))
+
+    async def get_all_business_user_rights(request):
+        return await user_rights_response(serializer_for("business_user_rights").select())
+
+    async def get_business_user_rights_by_business_id(request):
+        business_id = request.path_params["business_id"]
+        if not await fetch(select(Business.id).filter(Business.id == business_id)):
+            return json_response({"error": "Business not found"}, 404)
+        serializer = serializer_for("business_user_rights")
+        return await user_rights_response(serializer.select().filter(BusinessUserRights.businessId == business_id))
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await engine.dispose()
+
+    prefix = "/api/v1/business"
+    return Starlette(
+        routes=[
+            # Static paths first so they aren't taken for a business id
+            Route(f"{prefix}/export", flask_asgi),
+            Route(f"{prefix}/user_rights", get_all_business_user_rights, methods=["GET"]),
+            Route(f"{prefix}/user_rights/{{user_id}}", uuid_path(get_business_user_rights), methods=["GET"]),
+            Route(f"{prefix}/", get_all_business_data, methods=["GET"]),
+            Route(f"{prefix}/{{business_id}}", uuid_path(get_business_data), methods=["GET"]),
+            Route(f"{prefix}/{{business_id}}/user_rights", uuid_path(get_business_user_rights_by_business_id), methods=["GET"]),
+            Mount("/", flask_asgi),
+        ],
+        lifespan=lifespan,
+    )
@@ -1,19 +1,118 @@
 from flask import Blueprint, request, jsonify, current_app
-from werkzeug.security import generate_password_hash, check_password_hash
 #from itsdangerous import TimedJSONWebSignatureSerializer as Serializer
 from itsdangerous.url_safe import URLSafeTimedSerializer as Serializer
-from . import db
-from volumx.models.user import User
+from . import db, mail_queue, password_utils
+from volumx.models.user import User, SEARCH_COLUMNS
+from volumx.models.business import BusinessUserRights
+from volumx.models.base import HexUUID
 from functools import wraps
 from datetime import datetime, timedelta
 from random import randint
-from .auth_utils import login_required, admin_required
+from .auth_utils import login_required, admin_required, principal_cache
+from .password_utils import password_hasher, PasswordHashingBusy
+from .token_blocklist import token_blocklist
+from .db_utils import page_args, query_keyset, next_page_headers, change_marker
+from .serializers import serializer_for
+from .cache_utils import invalidate, conditional
+from sqlalchemy import func, or_, and_, inspect, text, select
+from volumx.mail_queue import MailQueueFull
+from flask_mail import Message
+import hmac
+import secrets
 from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, decode_token, get_jwt_identity, get_jwt
 from flasgger import swag_from
 
 # Create a Blueprint for authentication routes
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/v1/auth')
 
+
+@auth_bp.record_once
+def configure_principal_cache(state):
+    """Size the authenticated principal cache from the app config"""
+    principal_cache.configure(
+        maxsize=state.app.config.get('PRINCIPAL_CACHE_SIZE', 10000),
+        ttl=state.app.config.get('PRINCIPAL_CACHE_TTL', 60),
+    )
+
+
+@auth_bp.record_once
+def configure_password_hasher(state):
+    """Set the password hashing algorithm, cost and worker pool from the app config"""
+    password_hasher.configure(
+        method=state.app.config.get('PASSWORD_HASH_METHOD', password_utils.DEFAULT_METHOD),
+        workers=state.app.config.get('PASSWORD_HASH_WORKERS', password_utils.DEFAULT_WORKERS),
+        max_pending=state.app.config.get('PASSWORD_HASH_MAX_PENDING', password_utils.DEFAULT_MAX_PENDING),
+        queue_timeout=state.app.config.get('PASSWORD_HASH_QUEUE_TIMEOUT', password_utils.DEFAULT_QUEUE_TIMEOUT),
+    )
+
+
+@auth_bp.record_once
+def configure_token_blocklist(state):
+    """Set how often revoked tokens are synced and pruned from the app config"""
+    token_blocklist.configure(
+        sync_interval=state.app.config.get('TOKEN_BLOCKLIST_SYNC_INTERVAL', 5),
+        prune_interval=state.app.config.get('TOKEN_BLOCKLIST_PRUNE_INTERVAL', 600),
+    )
+
+
+def hashing_busy():
+    """503 response when the password hashing pool has no free slot"""
+    return jsonify({'message': 'Server busy, please try again'}), 503
+
+
+def user_marker(user_id=None):
+    """Count and newest updatedAt of the matching users"""
+    query = db.session.query(func.count(User.id), func.max(User.updatedAt))
+    if user_id is not None:
+        query = query.filter(User.id == user_id)
+    return change_marker(*query.one())
+
+
+def deleted_user_resources(user_id):
+    """Cached resource names a user's deletion changes.
+
+    The database cascades the deletion to the user's business user rights,
+    so the businesses they were on are looked up before the rows go.
+    """
+    business_ids = db.session.scalars(
+        select(BusinessUserRights.businessId).filter(BusinessUserRights.userId == user_id).distinct()
+    ).all()
+    return [
+        'users', f'user:{user_id}', 'business_user_rights', f'business_user_rights:user:{user_id}',
+        *[f'business_user_rights:business:{business_id}' for business_id in business_ids],
+    ]
+
+
+# Whether each engine's database has the SQLite users_fts search index
+_users_fts = {}
+
+
+def user_search_condition(term):
+    """Filter matching users whose email, first or last name starts with term.
+
+    The prefix LIKEs on lower() are served by the ix_users_*_lower indexes on
+    PostgreSQL. SQLite can't use those for LIKE, so there the users_fts index
+    narrows the candidates first and the LIKEs only check its matches.
+    """
+    term = term.lower()
+    pattern = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    condition = or_(*(func.lower(getattr(User, column)).like(pattern, escape='\\') for column in SEARCH_COLUMNS))
+
+    bind = db.session.get_bind()
+    if bind.dialect.name != 'sqlite' or not any(char.isalnum() for char in term):
+        return condition
+    if bind not in _users_fts:
+        _users_fts[bind] = inspect(bind).has_table('users_fts')
+    if not _users_fts[bind]:
+        return condition
+
+    # A quoted phrase with a trailing * matches consecutive tokens, the last
+    # one by prefix, so "john.d" finds "john.doe@..."
+    match = '{%s} : "%s"*' % (' '.join(SEARCH_COLUMNS), term.replace('"', '""'))
+    candidates = text('SELECT id FROM users_fts WHERE users_fts MATCH :match').bindparams(match=match)
+    return and_(User.id.in_(candidates.columns(id=HexUUID)), condition)
+
+
 # Endpoint for user registration
 @auth_bp.route('/register', methods=['POST'])
 @swag_from('../swagger_config.yaml')
@@ -44,8 +143,9 @@ def register():
             return jsonify({'message': 'Email already exists'}), 400
 
         # Create a new user
-        new_user = User(email=data['email'], first_name=data['first_name'], last_name=data['last_name'], password=generate_password_hash(data['password']))
+        new_user = User(email=data['email'], first_name=data['first_name'], last_name=data['last_name'], password=password_hasher.hash(data['password']))
         new_user.insert()
+        invalidate('users')
 
         access_token = create_access_token(identity=new_user.id, expires_delta=timedelta(hours=1))   # Access token expires in 1 hour
         refresh_token = create_refresh_token(identity=new_user.id, expires_delta=timedelta(days=90))  # Refresh token expires in 24 hours
@@ -66,6 +166,8 @@ def register():
             "updatedAt": new_user.updatedAt
         }
         return jsonify({'message': 'User registered successfully.', 'userData': userData}), 201
+    except PasswordHashingBusy:
+        return hashing_busy()
     except Exception as e:
         current_app.log_exception(exc_info=e)
         return (
@@ -91,8 +193,17 @@ def login():
     data['email'] = data['email'].lower()
 
     user = User.query.filter_by(email=data['email']).first()
-    if not user or not check_password_hash(user.password, data['password']):
-        return jsonify({'message': 'Invalid email or password'}), 401
+    try:
+        if not user or not password_hasher.verify(user.password, data['password']):
+            return jsonify({'message': 'Invalid email or password'}), 401
+
+        # Upgrade hashes made with an older algorithm or cost
+        if password_hasher.needs_rehash(user.password):
+            user.password = password_hasher.hash(data['password'])
+            db.session.commit()
+            invalidate('users', f'user:{user.id}')
+    except PasswordHashingBusy:
+        return hashing_busy()
 
     # Generate and return an authentication token for the user
     access_token = create_access_token(identity=user.id, expires_delta=timedelta(hours=1))   # Access token expires in 1 hour
@@ -126,36 +237,147 @@ def refresh():
 
 # Endpoint for user logout
 @auth_bp.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
 def logout():
+    # Revoke the token the request was made with, and the refresh token
+    # issued alongside it when the client sends that too
+    claims = get_jwt()
+    refresh_token = (request.get_json(silent=True) or {}).get('refreshToken')
+    if refresh_token:
+        try:
+            refresh_claims = decode_token(refresh_token)
+        except Exception:
+            return jsonify({'message': 'Invalid refresh token'}), 400
+        if refresh_claims['sub'] != claims['sub']:
+            return jsonify({'message': 'Invalid refresh token'}), 400
+        token_blocklist.revoke(refresh_claims['jti'], refresh_claims['exp'])
+
+    token_blocklist.revoke(claims['jti'], claims['exp'])
     return jsonify({'message': 'Logged out successfully'}), 200
 
 
+# Endpoint to email a one-time password for confirming the user's email
+@auth_bp.route('/email/otp', methods=['POST'])
+@login_required
+def send_email_otp(principal):
+    user = User.query.get(principal.id)
+    # Other workers may still have a deleted user in their principal cache
+    if not user:
+        return jsonify({'message': 'Unauthorized access'}), 401
+    if user.email_confirmed:
+        return jsonify({'message': 'Email already confirmed'}), 400
+
+    expiry_minutes = current_app.config.get('OTP_EXPIRY_MINUTES', 10)
+    user.otp = f'{secrets.randbelow(10 ** 6):06d}'
+    user.otp_expiry = datetime.now() + timedelta(minutes=expiry_minutes)
+    user.update()
+    invalidate('users', f'user:{user.id}')
+
+    # The mail goes out from the background sender, so the request doesn't
+    # wait on the SMTP server
+    try:
+        mail_queue.enqueue(Message(
+            'Your verification code',
+            recipients=[user.email],
+            body=f'Your verification code is {user.otp}. It expires in {expiry_minutes} minutes.',
+        ))
+    except MailQueueFull:
+        return jsonify({'message': 'Server busy, please try again'}), 503
+    return jsonify({'message': 'Verification code sent'}), 202
+
+# Endpoint to confirm the user's email with the emailed one-time password
+@auth_bp.route('/email/confirm', methods=['POST'])
+@login_required
+def confirm_email(principal):
+    data = request.get_json(silent=True) or {}
+    if 'otp' not in data:
+        return jsonify({'message': 'Verification code is required'}), 400
+
+    user = User.query.get(principal.id)
+    # Other workers may still have a deleted user in their principal cache
+    if not user:
+        return jsonify({'message': 'Unauthorized access'}), 401
+    if user.email_confirmed:
+        return jsonify({'message': 'Email already confirmed'}), 400
+    if not user.otp or user.otp_expiry < datetime.now():
+        return jsonify({'message': 'Verification code expired'}), 400
+    if not hmac.compare_digest(user.otp, str(data['otp'])):
+        return jsonify({'message': 'Invalid verification code'}), 400
+
+    user.email_confirmed = True
+    user.otp = None
+    user.otp_expiry = None
+    user.update()
+    invalidate('users', f'user:{user.id}')
+
+    try:
+        mail_queue.enqueue(Message(
+            'Your email is confirmed',
+            recipients=[user.email],
+            body=f'Hi {user.first_name}, your email address has been confirmed.',
+        ))
+    except MailQueueFull:
+        # The confirmation itself went through, the notice is best effort
+        current_app.logger.warning('Mail queue full, confirmation notice to %s dropped', user.email)
+    return jsonify({'message': 'Email confirmed successfully'}), 200
+
+
 # Endpoint for user profile deletion
 @auth_bp.route('/profile', methods=['DELETE'])
 @admin_required
 def delete_profile(user):
-    db.session.delete(user)
+    resources = deleted_user_resources(user.id)
+    db.session.delete(User.query.get(user.id))
     db.session.commit()
+    principal_cache.invalidate_user(user.id)
+    invalidate(*resources)
     return jsonify({'message': 'Profile deleted successfully'}), 200
 
 # Endpoint to get all users
 @auth_bp.route('/users', methods=['GET'])
+@conditional(user_marker, 'users')
 #@admin_required
 def get_users():
-    users = User.query.all()
-    total = len(users)
-    return jsonify([user.format() for user in users], "total_users:", total), 200
+    serializer = serializer_for('user')
+    limit, cursor = page_args()
+    try:
+        users, next_cursor = query_keyset(serializer.query(), User, limit, cursor)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    total = db.session.query(func.count(User.id)).scalar()
+    return jsonify(serializer.to_list(users), "total_users:", total), 200, next_page_headers(next_cursor, limit)
+
+# Endpoint to search users by email or name prefix
+@auth_bp.route('/users/search', methods=['GET'])
+@admin_required
+@conditional(user_marker, 'users')
+def search_users(admin):
+    term = request.args.get('q', '').strip()
+    if not term:
+        return jsonify({'message': 'Search query is required'}), 400
+
+    serializer = serializer_for('user')
+    limit, cursor = page_args()
+    condition = user_search_condition(term)
+    try:
+        users, next_cursor = query_keyset(serializer.query().filter(condition), User, limit, cursor)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    total = db.session.query(func.count(User.id)).filter(condition).scalar()
+    return jsonify({'users': serializer.to_list(users), 'total': total}), 200, next_page_headers(next_cursor, limit)
 
 # Endpoint to get a user by ID
-@auth_bp.route('/users/<user_id>', methods=['GET'])
+@auth_bp.route('/users/<hex_uuid:user_id>', methods=['GET'])
+@conditional(user_marker, 'user:{user_id}')
 def get_user(user_id):
-    user = User.query.get(user_id)
+    serializer = serializer_for('user')
+    user = serializer.query().filter(User.id == user_id).first()
     if not user:
         return jsonify({'message': 'User not found'}), 404
-    return jsonify(user.format()), 200
+    return jsonify(serializer.to_dict(user)), 200
 
 # Endpoint to update a user by ID
-@auth_bp.route('/users/<user_id>', methods=['PUT'])
+@auth_bp.route('/users/<hex_uuid:user_id>', methods=['PUT'])
 def update_user(user_id):
     user = User.query.get(user_id)
     if not user:
@@ -170,24 +392,32 @@ def update_user(user_id):
     if 'username' in data:
         user.username = data['username']
     if 'password' in data:
-        user.password = generate_password_hash(data['password'])
+        try:
+            user.password = password_hasher.hash(data['password'])
+        except PasswordHashingBusy:
+            return hashing_busy()
     db.session.commit()
+    principal_cache.invalidate_user(user_id)
+    invalidate('users', f'user:{user_id}')
     return jsonify(user.format()), 200
 
 # Endpoint to delete a user by ID
-@auth_bp.route('/users/<user_id>', methods=['DELETE'])
+@auth_bp.route('/users/<hex_uuid:user_id>', methods=['DELETE'])
 @admin_required
-def delete_user(user_id):
+def delete_user(admin, user_id):
     user = User.query.get(user_id)
     if not user:
         return jsonify({'message': 'User not found'}), 404
+    resources = deleted_user_resources(user_id)
     db.session.delete(user)
     db.session.commit()
+    principal_cache.invalidate_user(user_id)
+    invalidate(*resources)
     return jsonify({'message': 'User deleted successfully'}), 200
 
 
 # Endpoint to make a user an admin
-@auth_bp.route('/users/<user_id>/admin', methods=['PATCH'])
+@auth_bp.route('/users/<hex_uuid:user_id>/admin', methods=['PATCH'])
 @login_required
 def make_admin(user, user_id):
     user = User.query.get(user_id)
@@ -195,4 +425,6 @@ def make_admin(user, user_id):
         return jsonify({'message': 'User not found'}), 404
     user.is_admin = True
     db.session.commit()
+    principal_cache.invalidate_user(user_id)
+    invalidate('users', f'user:{user_id}')
     return jsonify(user.format()), 200
\ No newline at end of file
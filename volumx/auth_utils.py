@@ -1,9 +1,101 @@
 from itsdangerous.url_safe import URLSafeTimedSerializer as Serializer
-from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt_identity, jwt_required
+from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt_identity, get_jwt, jwt_required
 from flask import current_app, request, jsonify
 from functools import wraps
+from collections import OrderedDict, namedtuple
+from threading import Lock
+from volumx import db
 from volumx.models.user import User
 from datetime import datetime, timedelta
+import time
+
+
+# What the login decorators hand to the view: the user's id and flags plus
+# the decoded JWT claims
+Principal = namedtuple("Principal", ["id", "is_active", "is_admin", "claims"])
+
+
+class PrincipalCache:
+    """Per-process LRU cache of authenticated principals with a time to live.
+
+    Entries are keyed by (identity, jti), so each token is looked up once per
+    ttl instead of on every request. Routes that change a user's flags or
+    remove the user must call invalidate_user().
+    """
+
+    def __init__(self, maxsize=10000, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = Lock()
+
+    def configure(self, maxsize, ttl):
+        """Resize the cache and change the ttl, dropping current entries"""
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def get(self, key):
+        """Cached principal for (identity, jti), or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return principal
+
+    def set(self, key, principal):
+        """Store a principal, evicting the least recently used entries"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id):
+        """Drop every cached token of a user"""
+        with self._lock:
+            for key in self._keys_by_user.pop(user_id, ()):
+                self._entries.pop(key, None)
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+
+principal_cache = PrincipalCache()
+
+
+def load_principal():
+    """Principal of the current request's JWT, or None if the user is gone.
+
+    Only hits the database when the token is not in principal_cache.
+    """
+    claims = get_jwt()
+    user_id = get_jwt_identity()
+    key = (user_id, claims.get("jti"))
+    principal = principal_cache.get(key)
+    if principal is None:
+        user = db.session.query(User.id, User.is_active, User.is_admin).filter(User.id == user_id).first()
+        if not user:
+            return None
+        principal = Principal(user.id, user.is_active, user.is_admin, claims)
+        principal_cache.set(key, principal)
+    return principal
 
 
 # Decorator to check if the user is logged in
@@ -25,8 +117,7 @@ def login_required(f):
     @jwt_required()
     def decorated_function(*args, **kwargs):
         try:
-            current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
+            user = load_principal()
             if not user or not user.is_active:
                 return jsonify({'message': 'Unauthorized access'}), 401
         except Exception as e:
@@ -55,8 +146,7 @@ def admin_required(f):
     @jwt_required()
     def decorated_function(*args, **kwargs):
         try:
-            current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
+            user = load_principal()
             if not user or not user.is_active or not user.is_admin:
                 return jsonify({'message': 'Unauthorized access'}), 401
         except Exception as e:
@@ -1,6 +1,37 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from uuid import UUID
 
 
 class IdSchema(BaseModel):
-    id: UUID
\ No newline at end of file
+    id: UUID
+
+
+class BusinessCreateSchema(BaseModel):
+    """One business with its contact, address and owner rights"""
+    legalName: str = Field(max_length=50)
+    displayName: str = Field(max_length=50)
+    websiteLink: str = Field(max_length=255)
+    currency: str = Field(max_length=10)
+    businessType: str = Field(max_length=50)
+    businessGst: str = Field(max_length=50)
+    businessPan: str = Field(max_length=50)
+    businessLogo: str = Field(max_length=255)
+    orderSystem: bool
+    email: str = Field(max_length=255)
+    phoneCode: int
+    phoneNumber: int
+    fullAddress: str = Field(max_length=255)
+    district: str = Field(max_length=255)
+    city: str = Field(max_length=255)
+    country: str = Field(max_length=50)
+    addressState: str = Field(max_length=255)
+    postalCode: str = Field(max_length=10)
+    directions: str = Field(max_length=255)
+    userId: str
+    productRights: bool
+    inventoryRights: bool
+    salesRights: bool
+    salesPosRights: bool
+    suppliersRights: bool
+    analyticsViewRights: bool
+    ownerRights: bool
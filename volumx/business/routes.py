@@ -1,8 +1,16 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from volumx.models.business import Business, Contact, Address, BusinessUserRights
 from volumx.models.user import User
 from volumx import db
-from volumx.business.business_schemas import IdSchema
+from volumx.business.business_schemas import IdSchema, BusinessCreateSchema
+from volumx.models.base import get_uuid, canonical_id
+from volumx.db_utils import eager_chain, page_args, query_keyset, next_page_headers, change_marker, begin_unit_of_work, finish_unit_of_work, query_existing, unique_violation_field
+from volumx.serializers import serializer_for
+from volumx.cache_utils import cached_view, invalidate, conditional
+from sqlalchemy import func, insert, update, delete, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from pydantic import ValidationError
+import json
 from datetime import datetime, timedelta
 from uuid import UUID
 
@@ -10,106 +18,133 @@ from uuid import UUID
 # Create a Blueprint for business routes
 business_bp = Blueprint('business', __name__, url_prefix='/api/v1/business')
 
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Request fields stored on each table
+BUSINESS_FIELDS = {'legalName', 'displayName', 'websiteLink', 'currency', 'businessType', 'businessGst', 'businessPan', 'businessLogo', 'orderSystem'}
+CONTACT_FIELDS = {'email', 'phoneCode', 'phoneNumber'}
+ADDRESS_FIELDS = {'fullAddress', 'district', 'city', 'country', 'addressState', 'postalCode', 'directions'}
+RIGHTS_FIELDS = {'userId', 'productRights', 'inventoryRights', 'salesRights', 'salesPosRights', 'suppliersRights', 'analyticsViewRights', 'ownerRights'}
+
+# Every route commits once per request instead of once per model write
+business_bp.before_request(begin_unit_of_work)
+business_bp.after_request(finish_unit_of_work)
+
+
+def business_query(strategy=None):
+    """Query for Business with its Contact and Address loaded up front, for
+    the update routes, which change all three.
+
+    With the default "joined" strategy the whole Business -> Contact -> Address
+    tree comes back in a single SELECT.
+    """
+    strategy = strategy or current_app.config.get('BUSINESS_LOADER_STRATEGY', 'joined')
+    return Business.query.options(eager_chain(Business.contact, Contact.address, strategy=strategy))
+
+
+def unique_conflict(error):
+    """409 response naming the field whose unique constraint a write broke"""
+    field = unique_violation_field(error)
+    if field is None:
+        return jsonify({"error": str(error.orig)}), 400
+    return jsonify({"error": f"Business already exists with the same {field}", "field": field}), 409
+
+
+def business_marker(business_id=None):
+    """Count and newest updatedAt across the business tables the request reads.
+
+    Follows the joins of the ?fields= subset, so a request that leaves out the
+    contact or address never touches those tables here either.
+    """
+    try:
+        serializer = serializer_for('business', request.args.get('fields'))
+    except ValueError:
+        return None
+    models = [Business] + [model for model, _ in serializer.joins]
+    query = db.session.query(
+        func.count(Business.id), *[func.max(model.updatedAt) for model in models]
+    ).select_from(Business)
+    for model, onclause in serializer.joins:
+        query = query.outerjoin(model, onclause)
+    if business_id is not None:
+        query = query.filter(Business.id == business_id)
+    return change_marker(*query.one())
+
+
+def business_user_rights_marker(business_id=None, user_id=None):
+    """Count and newest updatedAt of the matching business user rights rows"""
+    query = db.session.query(func.count(BusinessUserRights.id), func.max(BusinessUserRights.updatedAt))
+    if business_id is not None:
+        query = query.filter(BusinessUserRights.businessId == business_id)
+    if user_id is not None:
+        query = query.filter(BusinessUserRights.userId == user_id)
+    return change_marker(*query.one())
+
 
 # Route to get a single business data by id
-@business_bp.route('/<business_id>', methods=['GET'])
+@business_bp.route('/<hex_uuid:business_id>', methods=['GET'])
+@conditional(business_marker, 'business:{business_id}')
+@cached_view('business:{business_id}')
 def get_business_data(business_id):
-    business = Business.query.get(business_id)
+    try:
+        serializer = serializer_for('business', request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    business = serializer.query().filter(Business.id == business_id).first()
 
     if not business:
         return jsonify({"error": "Business not found"}), 404
 
     try:
-        business_data = {
-            "businessId": business.id,
-            "legalName": business.legalName,
-            "displayName": business.displayName,
-            "websiteLink": business.websiteLink,
-            "currency": business.currency,
-            "businessType": business.businessType,
-            "businessGst": business.businessGst,
-            "businessPan": business.businessPan,
-            "businessLogo": business.businessLogo,
-            "orderSystem": business.orderSystem
-        }
-
-        contact_data = {
-            "contactId": business.contact.id,
-            "email": business.contact.email,
-            "phoneCode": business.contact.phoneCode,
-            "phoneNumber": business.contact.phoneNumber
-        }
-
-        address_data = {
-            "addressId": business.contact.address.id,
-            "fullAddress": business.contact.address.fullAddress,
-            "district": business.contact.address.district,
-            "city": business.contact.address.city,
-            "country": business.contact.address.country,
-            "addressState": business.contact.address.addressState,
-            "postalCode": business.contact.address.postalCode,
-            "directions": business.contact.address.directions
-        }
-
-        business_data['contact'] = contact_data
-        business_data['contact']['address'] = address_data
-
-        return jsonify(business_data), 200
+        return jsonify(serializer.to_dict(business)), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 404
 
 
 # Route to get all businesses data
 @business_bp.route('/', methods=['GET'])
+@conditional(business_marker, 'business')
+@cached_view('business')
 def get_all_business_data():
-    businesses = Business.query.all()
+    # Clients asking for NDJSON get the whole table streamed instead of a page
+    if request.accept_mimetypes.best == NDJSON_MIMETYPE:
+        return export_business_data()
+
+    limit, cursor = page_args()
+    try:
+        serializer = serializer_for('business', request.args.get('fields'))
+        businesses, next_cursor = query_keyset(serializer.query(), Business, limit, cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     if not businesses:
         return jsonify({"error": "Businesses not found", "businessesData": []}), 404
 
     try:
-        businesses_data = []
-
-        for business in businesses:
-            business_data = {
-                "businessId": business.id,
-                "legalName": business.legalName,
-                "displayName": business.displayName,
-                "websiteLink": business.websiteLink,
-                "currency": business.currency,
-                "businessType": business.businessType,
-                "businessGst": business.businessGst,
-                "businessPan": business.businessPan,
-                "businessLogo": business.businessLogo,
-                "orderSystem": business.orderSystem
-            }
+        businesses_data = serializer.to_list(businesses)
+        return jsonify(businesses_data), 200, next_page_headers(next_cursor, limit)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 404
 
-            contact_data = {
-                "contactId": business.contact.id,
-                "email": business.contact.email,
-                "phoneCode": business.contact.phoneCode,
-                "phoneNumber": business.contact.phoneNumber
-            }
 
-            address_data = {
-                "addressId": business.contact.address.id,
-                "fullAddress": business.contact.address.fullAddress,
-                "district": business.contact.address.district,
-                "city": business.contact.address.city,
-                "country": business.contact.address.country,
-                "addressState": business.contact.address.addressState,
-                "postalCode": business.contact.address.postalCode,
-                "directions": business.contact.address.directions
-            }
+# Route to stream every business as newline delimited JSON
+@business_bp.route('/export', methods=['GET'])
+def export_business_data():
+    try:
+        serializer = serializer_for('business', request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+    # yield_per streams rows from a server-side cursor in batches, so memory
+    # stays flat no matter how many businesses there are
+    query = serializer.query().order_by(Business.createdAt.desc(), Business.id.desc()).yield_per(batch_size)
 
-            business_data['contact'] = contact_data
-            business_data['contact']['address'] = address_data
+    def generate():
+        for business in query:
+            yield current_app.json.dumps(serializer.to_dict(business)) + "\n"
 
-            businesses_data.append(business_data)
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
 
-        return jsonify(businesses_data), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 404
 
 # Route to create a new business
 @business_bp.route('/', methods=['POST'])
@@ -132,21 +167,8 @@ def create_business():
         if not user:
             return jsonify({"error": "User not found"}), 404
 
-        # Check if the user exists by checking email and phone number in Contact Model
-        email_exists = Contact.query.filter_by(email=data['email']).first()
-        phone_exists = Contact.query.filter_by(phoneNumber=data['phoneNumber']).first()
-        print(email_exists)
-        print(phone_exists)
-
-        if email_exists or phone_exists:
-            return jsonify({"error": "Business already exists with the same email and phone number"}), 409
-
-
-        # Check if the business already exists
-        legal_name_exists = Business.query.filter_by(legalName=data['legalName']).first()
-        display_name_exists = Business.query.filter_by(displayName=data['displayName']).first()
-        if legal_name_exists or display_name_exists:
-            return jsonify({"error": "Business already exists with the same Legal name and display name"}), 409
+        # Duplicate emails, phone numbers and names are caught by the unique
+        # constraints when the rows are flushed, see unique_conflict()
 
         # Create a new address
         address = Address(
@@ -198,12 +220,112 @@ def create_business():
         )
         business_user_rights.insert()
 
+        invalidate('business', 'business_user_rights', f"business_user_rights:user:{user.id}")
+
         return jsonify({"message": "Business created successfully", "businessId": business.id}), 201
+    except IntegrityError as e:
+        return unique_conflict(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+# Route to create many businesses at once from a JSON array or NDJSON body
+@business_bp.route('/bulk', methods=['POST'])
+def bulk_create_business():
+    if request.mimetype == NDJSON_MIMETYPE:
+        items = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                items.append(None)
+    else:
+        items = request.get_json(silent=True)
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Expected a JSON array or NDJSON body of businesses"}), 400
+
+    max_records = current_app.config.get('BULK_IMPORT_MAX_RECORDS', 5000)
+    if len(items) > max_records:
+        return jsonify({"error": f"At most {max_records} businesses can be imported at once"}), 400
+
+    # Validate every record in one pass
+    errors = {}
+    records = {}
+    for index, item in enumerate(items):
+        try:
+            records[index] = BusinessCreateSchema.model_validate(item)
+        except ValidationError as e:
+            errors[index] = [{"field": err["loc"][0] if err["loc"] else None, "error": err["msg"]} for err in e.errors()]
+
+    # Check uniqueness against the request itself and, with one IN query per
+    # column, against the database
+    unique_columns = [('email', Contact.email), ('phoneNumber', Contact.phoneNumber), ('legalName', Business.legalName), ('displayName', Business.displayName)]
+    for field, column in unique_columns:
+        existing = query_existing(column, [getattr(record, field) for record in records.values()])
+        seen = set()
+        for index, record in records.items():
+            value = getattr(record, field)
+            if value in existing:
+                errors.setdefault(index, []).append({"field": field, "error": "Already exists"})
+            elif value in seen:
+                errors.setdefault(index, []).append({"field": field, "error": "Duplicated in the request"})
+            seen.add(value)
+
+    # Ids come back from the database in the hex form, so compare and store
+    # that form whatever spelling the request used
+    for record in records.values():
+        record.userId = canonical_id(record.userId)
+    existing_users = query_existing(User.id, [record.userId for record in records.values()])
+    for index, record in records.items():
+        if record.userId not in existing_users:
+            errors.setdefault(index, []).append({"field": "userId", "error": "User not found"})
+
+    records = {index: record for index, record in records.items() if index not in errors}
+
+    # Insert each table with multi-row INSERT ... RETURNING statements
+    created = {}
+    if records:
+        now = datetime.now()
+        rows = {Address: [], Contact: [], Business: [], BusinessUserRights: []}
+        for record in records.values():
+            address_id, contact_id, business_id = get_uuid(), get_uuid(), get_uuid()
+            timestamps = {"createdAt": now, "updatedAt": now}
+            rows[Address].append({"id": address_id, **timestamps, **record.model_dump(include=ADDRESS_FIELDS)})
+            rows[Contact].append({"id": contact_id, "addressId": address_id, **timestamps, **record.model_dump(include=CONTACT_FIELDS)})
+            rows[Business].append({"id": business_id, "contactId": contact_id, **timestamps, **record.model_dump(include=BUSINESS_FIELDS)})
+            rows[BusinessUserRights].append({"id": get_uuid(), "businessId": business_id, **timestamps, **record.model_dump(include=RIGHTS_FIELDS)})
+
+        try:
+            returned = {
+                model: db.session.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), model_rows).all()
+                for model, model_rows in rows.items()
+            }
+        except IntegrityError as e:
+            return jsonify({"error": "Businesses conflict with existing data", "message": str(e.orig)}), 409
+
+        created = dict(zip(records, returned[Business]))
+
+        invalidate('business', 'business_user_rights', *{f'business_user_rights:user:{record.userId}' for record in records.values()})
+
+    results = []
+    for index in range(len(items)):
+        if index in created:
+            results.append({"index": index, "status": "created", "businessId": created[index]})
+        else:
+            results.append({"index": index, "status": "error", "errors": errors[index]})
+
+    if not created:
+        status = 400
+    elif errors:
+        status = 207
+    else:
+        status = 201
+    return jsonify({"created": len(created), "failed": len(errors), "results": results}), status
+
 # Route to update a business
-@business_bp.route('/<business_id>', methods=['PUT'])
+@business_bp.route('/<hex_uuid:business_id>', methods=['PUT'])
 def update_business(business_id):
     try:
         data = request.json
@@ -223,32 +345,13 @@ def update_business(business_id):
         if not user:
             return jsonify({"error": "User not found"}), 404
 
-        # Check if the business exists
-        business = Business.query.get(business_id)
+        # Check if the business exists, loading its contact and address with it
+        business = business_query().filter(Business.id == business_id).first()
         if not business:
             return jsonify({"error": "Business not found"}), 404
 
-        # Check if the user exists by checking email and phone number in Contact Model
-        email_exists = Contact.query.filter_by(email=data['email']).first()
-        phone_exists = Contact.query.filter_by(phoneNumber=data['phoneNumber']).first()
-        print(email_exists)
-        print(phone_exists)
-
-        if email_exists or phone_exists:
-            return jsonify({"error": "Business already exists with the same email and phone number"}), 409
-
-
-        # Check if the business already exists
-        legal_name_exists = Business.query.filter_by(legalName=data['legalName']).first()
-        display_name_exists = Business.query.filter_by(displayName=data['displayName']).first()
-        if legal_name_exists or display_name_exists:
-            return jsonify({"error": "Business already exists with the same Legal name and display name"}), 409
-
-
-        # Check if the business exists
-        business = Business.query.get(business_id)
-        if not business:
-            return jsonify({"error": "Business not found"}), 404
+        # Duplicate emails, phone numbers and names are caught by the unique
+        # constraints when the rows are flushed, see unique_conflict()
 
         # Update the business
         business.legalName = data['legalName']
@@ -263,7 +366,7 @@ def update_business(business_id):
         business.update()
 
         # Update the address
-        address = Address.query.get(business.contact.addressId)
+        address = business.contact.address
         address.fullAddress = data['fullAddress']
         address.district = data['district']
         address.city = data['city']
@@ -274,7 +377,7 @@ def update_business(business_id):
         address.update()
 
         # Update the contact
-        contact = Contact.query.get(business.contactId)
+        contact = business.contact
         contact.email = data['email']
         contact.phoneCode = data['phoneCode']
         contact.phoneNumber = data['phoneNumber']
@@ -293,12 +396,19 @@ def update_business(business_id):
         business_user_rights.ownerRights = data['ownerRights']
         business_user_rights.update()
 
+        invalidate(
+            'business', f'business:{business_id}', 'business_user_rights',
+            f'business_user_rights:business:{business_id}', f"business_user_rights:user:{user.id}"
+        )
+
         return jsonify({"message": "Business updated successfully"}), 200
+    except IntegrityError as e:
+        return unique_conflict(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 # Route to update a business PATCH
-@business_bp.route('/<business_id>', methods=['PATCH'])
+@business_bp.route('/<hex_uuid:business_id>', methods=['PATCH'])
 def patch_business(business_id):
     try:
         data = request.json
@@ -308,7 +418,7 @@ def patch_business(business_id):
             return jsonify({"error": "No data provided"}), 400
 
         # Check if the business exists
-        business = Business.query.get(business_id)
+        business = business_query().filter(Business.id == business_id).first()
         if not business:
             return jsonify({"error": "Business not found"}), 404
 
@@ -333,146 +443,158 @@ def patch_business(business_id):
 
         business.contact.update()
 
+        invalidate('business', f'business:{business_id}')
+
         return jsonify({"message": "Business patched successfully"}), 200
+    except IntegrityError as e:
+        return unique_conflict(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+def delete_business_trees(business_ids):
+    """Delete businesses together with their contact, address and rights.
+
+    Deleting the address cascades through contact, business and rights in the
+    database (ON DELETE CASCADE), so each chunk of businesses is one DELETE.
+    Contacts without an address are deleted by id, which cascades to their
+    business, and businesses without a contact are deleted last.
+
+    Returns:
+        (ids of the deleted businesses, ids of the users whose rights went with them)
+    """
+    deleted, user_ids = set(), set()
+    business_ids = list(set(business_ids))
+    for start in range(0, len(business_ids), 500):
+        chunk = business_ids[start:start + 500]
+
+        # The tree of each business that exists and the users holding rights
+        # on it, for the deletes, the response and the cache invalidation
+        trees = {}
+        for business_id, contact_id, address_id, user_id in db.session.query(
+            Business.id, Business.contactId, Contact.addressId, BusinessUserRights.userId
+        ).outerjoin(Contact, Contact.id == Business.contactId).outerjoin(
+            BusinessUserRights, BusinessUserRights.businessId == Business.id
+        ).filter(Business.id.in_(chunk)):
+            trees[business_id] = (contact_id, address_id)
+            if user_id is not None:
+                user_ids.add(user_id)
+        if not trees:
+            continue
+
+        address_ids = {address_id for _, address_id in trees.values() if address_id is not None}
+        loose_contact_ids = {contact_id for contact_id, address_id in trees.values() if contact_id is not None and address_id is None}
+        loose_business_ids = {business_id for business_id, (contact_id, _) in trees.items() if contact_id is None}
+        for model, ids in ((Address, address_ids), (Contact, loose_contact_ids), (Business, loose_business_ids)):
+            if ids:
+                db.session.execute(delete(model).where(model.id.in_(ids)), execution_options={"synchronize_session": False})
+        deleted.update(trees)
+
+    if deleted:
+        invalidate(
+            'business', 'business_user_rights',
+            *{f'business:{business_id}' for business_id in deleted},
+            *{f'business_user_rights:business:{business_id}' for business_id in deleted},
+            *{f'business_user_rights:user:{user_id}' for user_id in user_ids},
+        )
+    return deleted, user_ids
+
+
 # Route to delete a business
-@business_bp.route('/<business_id>', methods=['DELETE'])
+@business_bp.route('/<hex_uuid:business_id>', methods=['DELETE'])
 def delete_business(business_id):
     try:
-        # Check if the business exists
-        business = Business.query.get(business_id)
-        if not business:
+        deleted, _ = delete_business_trees([business_id])
+        if not deleted:
             return jsonify({"error": "Business not found"}), 404
 
-        # Delete the business user rights
-        business_user_rights = BusinessUserRights.query.filter_by(businessId=business.id).first()
-        business_user_rights.delete()
-
-        # Delete the business
-        business.delete()
-
-        # Delete the contact
-        contact = Contact.query.get(business.contactId)
-        contact.delete()
-
-        # Delete the address
-        address = Address.query.get(contact.addressId)
-        address.delete()
-
         return jsonify({"message": "Business deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+# Route to delete many businesses by id or by a filter on business fields
+@business_bp.route('/bulk', methods=['DELETE'])
+def bulk_delete_business():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or ('ids' in data) == ('filter' in data):
+        return jsonify({"error": "Provide either ids or a filter"}), 400
+
+    if 'ids' in data:
+        business_ids = data['ids']
+        if not isinstance(business_ids, list) or not business_ids:
+            return jsonify({"error": "ids must be a non-empty list"}), 400
+    else:
+        row_filter = data['filter']
+        if not isinstance(row_filter, dict) or not row_filter or set(row_filter) - BUSINESS_FIELDS:
+            return jsonify({"error": f"filter may only use {', '.join(sorted(BUSINESS_FIELDS))}"}), 400
+        business_ids = [business_id for (business_id,) in db.session.query(Business.id).filter_by(**row_filter)]
+
+    deleted, _ = delete_business_trees(business_ids)
+    return jsonify({"message": "Businesses deleted successfully", "deleted": len(deleted), "businessIds": sorted(deleted)}), 200
+
 # Works
 # Route to get the Business User Rights by User ID
-@business_bp.route('/user_rights/<user_id>', methods=['GET'])
+@business_bp.route('/user_rights/<hex_uuid:user_id>', methods=['GET'])
+@conditional(business_user_rights_marker, 'business_user_rights:user:{user_id}')
+@cached_view('business_user_rights:user:{user_id}')
 def get_business_user_rights(user_id):
     try:
         # Check if the user exists
-        user = User.query.get(user_id)
+        user = db.session.query(User.id).filter(User.id == user_id).first()
         if not user:
             return jsonify({"error": "User not found"}), 404
 
         # Get the business user rights
-        business_user_rights = BusinessUserRights.query.filter_by(userId=user.id).all()
+        serializer = serializer_for('business_user_rights')
+        business_user_rights = serializer.query().filter(BusinessUserRights.userId == user_id).all()
         if not business_user_rights:
             return jsonify({"error": "Business user rights not found"}), 404
 
-        business_user_rights_data = []
-
-        for business_user_right in business_user_rights:
-            business_user_right_data = {
-                "businessId": business_user_right.businessId,
-                "userId": business_user_right.userId,
-                "productRights": business_user_right.productRights,
-                "inventoryRights": business_user_right.inventoryRights,
-                "salesRights": business_user_right.salesRights,
-                "salesPosRights": business_user_right.salesPosRights,
-                "suppliersRights": business_user_right.suppliersRights,
-                "analyticsViewRights": business_user_right.analyticsViewRights,
-                "ownerRights": business_user_right.ownerRights
-            }
-
-            business_user_rights_data.append(business_user_right_data)
-
-        return jsonify(business_user_rights_data), 200
+        return jsonify(serializer.to_list(business_user_rights)), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 # WOrks
 # Route to get all Business User Rights
 @business_bp.route('/user_rights', methods=['GET'])
+@conditional(business_user_rights_marker, 'business_user_rights')
+@cached_view('business_user_rights')
 def get_all_business_user_rights():
     try:
         # Get the business user rights
-        business_user_rights = BusinessUserRights.query.all()
+        serializer = serializer_for('business_user_rights')
+        business_user_rights = serializer.query().all()
         if not business_user_rights:
             return jsonify({"error": "Business user rights not found"}), 404
 
-        business_user_rights_data = []
-
-        for business_user_right in business_user_rights:
-            business_user_right_data = {
-                "id": business_user_right.id,
-                "businessId": business_user_right.businessId,
-                "userId": business_user_right.userId,
-                "productRights": business_user_right.productRights,
-                "inventoryRights": business_user_right.inventoryRights,
-                "salesRights": business_user_right.salesRights,
-                "salesPosRights": business_user_right.salesPosRights,
-                "suppliersRights": business_user_right.suppliersRights,
-                "analyticsViewRights": business_user_right.analyticsViewRights,
-                "ownerRights": business_user_right.ownerRights
-            }
-
-            business_user_rights_data.append(business_user_right_data)
-
-        return jsonify(business_user_rights_data), 200
+        return jsonify(serializer.to_list(business_user_rights)), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 # Works
 # Route to get the Business User Rights by Business ID
-@business_bp.route('/<business_id>/user_rights', methods=['GET'])
+@business_bp.route('/<hex_uuid:business_id>/user_rights', methods=['GET'])
+@conditional(business_user_rights_marker, 'business_user_rights:business:{business_id}')
+@cached_view('business_user_rights:business:{business_id}')
 def get_business_user_rights_by_business_id(business_id):
     try:
         # Check if the business exists
-        business = Business.query.get(business_id)
+        business = db.session.query(Business.id).filter(Business.id == business_id).first()
         if not business:
             return jsonify({"error": "Business not found"}), 404
 
         # Get the business user rights
-        business_user_rights = BusinessUserRights.query.filter_by(businessId=business.id).all()
+        serializer = serializer_for('business_user_rights')
+        business_user_rights = serializer.query().filter(BusinessUserRights.businessId == business_id).all()
         if not business_user_rights:
             return jsonify({"error": "Business user rights not found"}), 404
 
-        business_user_rights_data = []
-
-        for business_user_right in business_user_rights:
-            business_user_right_data = {
-                "id": business_user_right.id,
-                "businessId": business_user_right.businessId,
-                "userId": business_user_right.userId,
-                "productRights": business_user_right.productRights,
-                "inventoryRights": business_user_right.inventoryRights,
-                "salesRights": business_user_right.salesRights,
-                "salesPosRights": business_user_right.salesPosRights,
-                "suppliersRights": business_user_right.suppliersRights,
-                "analyticsViewRights": business_user_right.analyticsViewRights,
-                "ownerRights": business_user_right.ownerRights
-            }
-
-            business_user_rights_data.append(business_user_right_data)
-
-        return jsonify(business_user_rights_data), 200
+        return jsonify(serializer.to_list(business_user_rights)), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 # Works
 # Route to update a business user rights by business ID PATCH
-@business_bp.route('/<business_id>/user_rights', methods=['PATCH'])
+@business_bp.route('/<hex_uuid:business_id>/user_rights', methods=['PATCH'])
 def patch_business_user_rights_by_business_id(business_id):
     try:
         data = request.json
@@ -488,25 +610,107 @@ def patch_business_user_rights_by_business_id(business_id):
 
         # Update the business user rights
         business_user_rights = BusinessUserRights.query.filter_by(businessId=business_id).first()
+        previous_user_id = business_user_rights.userId
         for field in ['productRights', 'inventoryRights', 'salesRights', 'salesPosRights', 'suppliersRights', 'analyticsViewRights', 'ownerRights', 'userId']:
              if field in data:
                   setattr(business_user_rights, field, data[field])
 
         business_user_rights.update()
+        invalidate(
+            'business_user_rights', f'business_user_rights:business:{business_id}',
+            f'business_user_rights:user:{previous_user_id}', f'business_user_rights:user:{canonical_id(business_user_rights.userId)}'
+        )
 
-        business_user_right_data = {
-                "id": business_user_rights.id,
-                "businessId": business_user_rights.businessId,
-                "userId": business_user_rights.userId,
-                "productRights": business_user_rights.productRights,
-                "inventoryRights": business_user_rights.inventoryRights,
-                "salesRights": business_user_rights.salesRights,
-                "salesPosRights": business_user_rights.salesPosRights,
-                "suppliersRights": business_user_rights.suppliersRights,
-                "analyticsViewRights": business_user_rights.analyticsViewRights,
-                "ownerRights": business_user_rights.ownerRights
-            }
+        serializer = serializer_for('business_user_rights')
+        business_user_right_data = serializer.to_dict(
+            serializer.query().filter(BusinessUserRights.id == business_user_rights.id).one()
+        )
 
         return jsonify({"message": "Business user rights patched successfully", "business_user_right": business_user_right_data}), 200
     except Exception as e:
         return jsonify({"errors": str(e)}), 400
+
+
+# Route to update many business user rights in one transaction
+@business_bp.route('/user_rights', methods=['PATCH'])
+def bulk_patch_business_user_rights():
+    """Apply rights changes with set-based UPDATE statements.
+
+    The body is either a list of changes, each naming a businessId and userId
+    along with the rights to set:
+
+        {"changes": [{"businessId": ..., "userId": ..., "salesRights": false}, ...]}
+
+    or a filter on userId and/or businessId (a single id or a list) with the
+    rights to set on every matching row:
+
+        {"filter": {"userId": ..., "businessId": [...]}, "rights": {"salesRights": false}}
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or ('changes' in data) == ('filter' in data):
+        return jsonify({"error": "Provide either changes or a filter with rights"}), 400
+
+    right_fields = RIGHTS_FIELDS - {'userId'}
+
+    def invalid_rights(rights):
+        return not rights or any(field not in right_fields or not isinstance(value, bool) for field, value in rights.items())
+
+    # Group changes that set the same rights so each group is one UPDATE
+    statements = []
+    if 'changes' in data:
+        changes = data['changes']
+        if not isinstance(changes, list) or not changes:
+            return jsonify({"error": "changes must be a non-empty list"}), 400
+        max_changes = current_app.config.get('BULK_RIGHTS_MAX_CHANGES', 5000)
+        if len(changes) > max_changes:
+            return jsonify({"error": f"At most {max_changes} changes can be applied at once"}), 400
+
+        groups = {}
+        for index, change in enumerate(changes):
+            if not isinstance(change, dict) or 'businessId' not in change or 'userId' not in change:
+                return jsonify({"error": f"Change {index} needs a businessId and a userId"}), 400
+            rights = {field: value for field, value in change.items() if field not in ('businessId', 'userId')}
+            if invalid_rights(rights):
+                return jsonify({"error": f"Change {index} has invalid rights"}), 400
+            groups.setdefault(tuple(sorted(rights.items())), []).append((change['businessId'], change['userId']))
+
+        for rights, pairs in groups.items():
+            for start in range(0, len(pairs), 500):
+                chunk = pairs[start:start + 500]
+                statements.append((dict(rights), tuple_(BusinessUserRights.businessId, BusinessUserRights.userId).in_(chunk)))
+    else:
+        row_filter, rights = data['filter'], data.get('rights')
+        if not isinstance(row_filter, dict) or not row_filter or set(row_filter) - {'businessId', 'userId'}:
+            return jsonify({"error": "filter must contain businessId and/or userId"}), 400
+        if not isinstance(rights, dict) or invalid_rights(rights):
+            return jsonify({"error": "rights must map rights fields to booleans"}), 400
+
+        criteria = []
+        for field, value in row_filter.items():
+            column = getattr(BusinessUserRights, field)
+            criteria.append(column.in_(value) if isinstance(value, list) else column == value)
+        statements.append((rights, *criteria))
+
+    # Rows by id: one business and user pair may have several rows, and one
+    # row may match more than one change
+    now = datetime.now()
+    affected = {}
+    for rights, *criteria in statements:
+        result = db.session.execute(
+            update(BusinessUserRights).where(*criteria).values(**rights, updatedAt=now)
+            .returning(BusinessUserRights.id, BusinessUserRights.businessId, BusinessUserRights.userId),
+            execution_options={"synchronize_session": False},
+        )
+        affected.update((row_id, (business_id, user_id)) for row_id, business_id, user_id in result)
+
+    invalidate(
+        'business_user_rights',
+        *{f'business_user_rights:business:{business_id}' for business_id, _ in affected.values()},
+        *{f'business_user_rights:user:{user_id}' for _, user_id in affected.values()},
+    )
+
+    return jsonify({
+        "message": "Business user rights updated successfully",
+        "updated": len(affected),
+        "statements": len(statements),
+    }), 200
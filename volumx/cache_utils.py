@@ -0,0 +1,225 @@
+from flask import current_app, g, request, make_response
+from functools import wraps
+from threading import Lock
+from werkzeug.http import is_resource_modified
+import hashlib
+from volumx import cache
+from volumx.db_routing import replicas_enabled, sticky_seconds, use_primary
+from volumx.db_utils import after_commit
+
+
+# Hit/miss counters for cached views in this process
+CACHE_STATS = {"hits": 0, "misses": 0, "invalidations": 0}
+_stats_lock = Lock()
+
+# Cache backends every worker process reads and writes. The others keep a
+# copy per process, where a version bump in one worker never reaches the
+# rest, so they would go on serving the old responses
+SHARED_CACHE_TYPES = {
+    "redis", "rediscache", "redissentinel", "redissentinelcache", "rediscluster", "redisclustercache",
+}
+
+# SimpleCache prunes by iterating its dict, which breaks if another thread
+# writes at the same time, so writes from threaded workers go one at a time
+_write_lock = Lock()
+
+
+def _count(stat):
+    with _stats_lock:
+        CACHE_STATS[stat] += 1
+
+
+def _cache_set(key, value, timeout=None):
+    with _write_lock:
+        cache.set(key, value, timeout=timeout)
+
+
+def cache_is_shared(config=None):
+    """Whether CACHE_TYPE is a backend shared by all worker processes"""
+    config = current_app.config if config is None else config
+    cache_type = str(config.get("CACHE_TYPE") or "").rsplit(".", 1)[-1].lower()
+    return cache_type in SHARED_CACHE_TYPES
+
+
+def view_cache_enabled():
+    """Cached views need a shared cache, or VIEW_CACHE_LOCAL for a single process"""
+    return cache_is_shared() or bool(current_app.config.get("VIEW_CACHE_LOCAL"))
+
+
+def _version_key(name):
+    return f"version:{name}"
+
+
+def _written_key(name):
+    return f"written:{name}"
+
+
+def _versions(names):
+    """The "name@version,..." string of resource names.
+
+    Read once per request, so conditional and cached_view on the same route
+    agree on the versions.
+    """
+    known = g.setdefault("resource_versions", {})
+    missing = [name for name in names if name not in known]
+    if missing:
+        known.update(zip(missing, cache.get_many(*[_version_key(name) for name in missing])))
+    return ",".join(f"{name}@{known[name] or 0}" for name in names)
+
+
+def _bump_version(name):
+    key = _version_key(name)
+    if cache_is_shared():
+        # INCR is atomic and sets no expiry
+        cache.inc(key)
+    else:
+        # Holding the lock from the read to the write keeps two threads from
+        # both bumping to the same version. timeout=0 keeps counters from
+        # expiring and coming back at an old value
+        with _write_lock:
+            cache.set(key, (cache.get(key) or 0) + 1, timeout=0)
+
+
+def invalidate(*names):
+    """Bump the version counter of each resource name.
+
+    Cached responses embed the versions they were built from in their keys,
+    so bumping a version makes every entry that depends on it unreachable.
+    Inside a unit of work the bump waits for the commit, so a concurrent read
+    can't cache the old rows again under the new version.
+
+    Args:
+        names: resource names, e.g. "business" or "business:<id>"
+    """
+    def bump():
+        for name in names:
+            _bump_version(name)
+            _count("invalidations")
+        # Replicas may serve the old rows for a moment, see cached_view
+        seconds = sticky_seconds()
+        if seconds > 0:
+            with _write_lock:
+                cache.set_many({_written_key(name): True for name in names}, timeout=seconds)
+
+    after_commit(bump)
+
+
+def cached_view(*resources, timeout=None):
+    """Decorator caching successful responses of a GET route.
+
+    Only caches with a shared CACHE_TYPE (Redis) or VIEW_CACHE_LOCAL on,
+    otherwise the route runs uncached: with one cache per worker process,
+    the other workers would keep serving a response after its invalidation.
+
+    Parameters:
+        resources: resource names the response depends on. They are formatted
+            with the view arguments, e.g. "business:{business_id}".
+        timeout: seconds to keep entries, defaults to CACHE_DEFAULT_TIMEOUT
+
+    Returns:
+        function: The decorated function.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not view_cache_enabled():
+                return f(*args, **kwargs)
+
+            names = [resource.format(**kwargs) for resource in resources]
+            key = "view:{}:{}:{}".format(
+                _versions(names),
+                request.full_path,
+                request.headers.get("Accept", ""),
+            )
+
+            cached = cache.get(key)
+            if cached is not None:
+                _count("hits")
+                body, status, headers = cached
+                return make_response(body, status, headers)
+
+            _count("misses")
+            # A replica may still have the rows from before a recent write,
+            # which would be cached under the new version
+            if replicas_enabled() and any(cache.get_many(*[_written_key(name) for name in names])):
+                use_primary()
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                _cache_set(key, (response.get_data(), response.status_code, list(response.headers)), timeout=timeout)
+            return response
+
+        return decorated_function
+
+    return decorator
+
+
+def cache_stats():
+    """Snapshot of the hit/miss counters with the resulting hit ratio"""
+    with _stats_lock:
+        stats = dict(CACHE_STATS)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def conditional(validator, *resources):
+    """Decorator answering conditional GETs with 304 Not Modified.
+
+    The validator is called with the view arguments and returns the
+    (fingerprint, last_modified) pair of the data behind the response, or
+    None to skip. It should be a cheap aggregate query so a 304 can be sent
+    before the payload is built. The strong ETag is derived from the
+    fingerprint, the request path with its query string and the Accept
+    header. Goes outside cached_view.
+
+    Without view caching nothing can serve an old body, so the validator runs
+    on every request. With it, the validator's result is cached under the
+    versions of the resources, like cached_view's responses, so it runs once
+    per version, and the versions go into the ETag as well: every
+    invalidation that drops a cached body also changes its ETag.
+
+    Parameters:
+        validator (function): returns (fingerprint, last_modified) or None
+        resources: resource names the response depends on, as for cached_view
+
+    Returns:
+        function: The decorated function.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if view_cache_enabled():
+                versions = _versions([resource.format(**kwargs) for resource in resources])
+                key = f"marker:{versions}:{request.full_path}"
+                cached = cache.get(key)
+                if cached is None:
+                    # Wrapped in a tuple so a None result is cached too
+                    cached = (validator(**kwargs),)
+                    _cache_set(key, cached)
+                state = cached[0]
+            else:
+                versions = ""
+                state = validator(**kwargs)
+            if state is None:
+                return f(*args, **kwargs)
+
+            fingerprint, last_modified = state
+            etag = hashlib.sha1(
+                f"{versions}|{fingerprint}|{request.full_path}|{request.headers.get('Accept', '')}".encode()
+            ).hexdigest()
+
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = make_response("", 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            return response
+
+        return decorated_function
+
+    return decorator
+
@@ -1,5 +1,6 @@
 import os
 from dotenv import load_dotenv
+from volumx import password_utils
 
 
 load_dotenv(".env")
@@ -38,7 +39,107 @@ class Config(object):
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
     CACHE_DEFAULT_TIMEOUT = 300
-    CACHE_TYPE = "SimpleCache"
+
+    # Cached views and their version counters must be seen by every worker
+    # process, so they are only on with a Redis CACHE_TYPE (needs
+    # `pip install redis`), e.g. CACHE_TYPE=RedisCache with CACHE_REDIS_URL.
+    # VIEW_CACHE_LOCAL turns them on with the per-process SimpleCache, which
+    # is only safe when a single process serves the app
+    CACHE_TYPE = os.environ.get("CACHE_TYPE", "SimpleCache")
+    CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    VIEW_CACHE_LOCAL = os.environ.get("VIEW_CACHE_LOCAL", "False") == "True"
+
+    # Where the compiled Swagger spec is cached (defaults to the instance folder)
+    SWAGGER_CACHE_DIR = os.environ.get("SWAGGER_CACHE_DIR")
+
+    # Alembic migrations checked against the database on startup
+    MIGRATIONS_DIR = os.environ.get("MIGRATIONS_DIR", os.path.join(basedir, os.pardir, "migrations"))
+
+    # Database connection pool of each worker process. Keep
+    # workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) below the server's
+    # max_connections. DB_STATEMENT_TIMEOUT is in milliseconds, 0 disables it
+    # (PostgreSQL only). Setting SQLALCHEMY_ENGINE_OPTIONS overrides all of these.
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "True") == "True"
+    DB_STATEMENT_TIMEOUT = int(os.environ.get("DB_STATEMENT_TIMEOUT", 0))
+
+    # Read replicas as comma separated database URLs. GET requests read from
+    # one of them, picked round_robin or by lowest latency. A client that
+    # wrote reads from the primary for DB_REPLICA_STICKY_SECONDS, which should
+    # cover the replication lag
+    DB_REPLICA_URLS = [url for url in os.environ.get("DB_REPLICA_URLS", "").split(",") if url]
+    DB_REPLICA_STRATEGY = os.environ.get("DB_REPLICA_STRATEGY", "round_robin")
+    DB_REPLICA_STICKY_SECONDS = int(os.environ.get("DB_REPLICA_STICKY_SECONDS", 5))
+
+    # Proxies in front of the app that append to X-Forwarded-For and set
+    # X-Forwarded-Proto (1 on Render). The client address, which keys replica
+    # stickiness for requests without a token, is then read from those
+    # headers instead of being the proxy's for everyone. Leave at 0 when
+    # clients reach the app directly, or they could pick their own address
+    TRUSTED_PROXIES = int(os.environ.get("TRUSTED_PROXIES", 0))
+
+    # A request running the same SQL statement more than this many times is
+    # logged as a likely N+1 query, and fails with TESTING on. 0 disables it
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get("N_PLUS_ONE_THRESHOLD", 10))
+
+    # Level of the volumx.query_stats logger, which logs a JSON line of SQL
+    # stats per request at INFO and likely N+1 queries at WARNING. Logged to
+    # stderr unless logging is configured otherwise
+    QUERY_STATS_LOG_LEVEL = os.environ.get("QUERY_STATS_LOG_LEVEL", "INFO")
+
+    # How Business -> Contact -> Address is loaded when PUT and PATCH fetch a
+    # business to update (joined, selectin, subquery or lazy). Read routes
+    # select columns through volumx.serializers and don't use it
+    BUSINESS_LOADER_STRATEGY = os.environ.get("BUSINESS_LOADER_STRATEGY", "joined")
+
+    # Keyset pagination for list routes
+    PAGINATION_DEFAULT_LIMIT = int(os.environ.get("PAGINATION_DEFAULT_LIMIT", 50))
+    PAGINATION_MAX_LIMIT = int(os.environ.get("PAGINATION_MAX_LIMIT", 500))
+
+    # Rows fetched per round trip by the NDJSON business export
+    EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))
+
+    # Largest number of businesses accepted by POST /api/v1/business/bulk
+    BULK_IMPORT_MAX_RECORDS = int(os.environ.get("BULK_IMPORT_MAX_RECORDS", 5000))
+
+    # Largest number of changes accepted by PATCH /api/v1/business/user_rights
+    BULK_RIGHTS_MAX_CHANGES = int(os.environ.get("BULK_RIGHTS_MAX_CHANGES", 5000))
+
+    # Per-process cache of authenticated users, keyed by identity and token jti
+    PRINCIPAL_CACHE_SIZE = int(os.environ.get("PRINCIPAL_CACHE_SIZE", 10000))
+    PRINCIPAL_CACHE_TTL = int(os.environ.get("PRINCIPAL_CACHE_TTL", 60))
+
+    # Password hashing: Werkzeug method string (algorithm and cost), processes
+    # hashing in parallel (0 hashes inline), how many more requests may wait
+    # for one and for how many seconds
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", password_utils.DEFAULT_METHOD)
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", password_utils.DEFAULT_WORKERS))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", password_utils.DEFAULT_MAX_PENDING))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.environ.get("PASSWORD_HASH_QUEUE_TIMEOUT", password_utils.DEFAULT_QUEUE_TIMEOUT))
+
+    # Revoked JWTs: seconds between pulls of other workers' revocations and
+    # between prunes of expired entries
+    TOKEN_BLOCKLIST_SYNC_INTERVAL = float(os.environ.get("TOKEN_BLOCKLIST_SYNC_INTERVAL", 5))
+    TOKEN_BLOCKLIST_PRUNE_INTERVAL = float(os.environ.get("TOKEN_BLOCKLIST_PRUNE_INTERVAL", 600))
+
+    # Outgoing mail queue: capacity, messages sent per SMTP connection
+    # round, retries with their base backoff in seconds, seconds an idle SMTP
+    # connection is kept open and seconds to keep sending at exit
+    MAIL_QUEUE_SIZE = int(os.environ.get("MAIL_QUEUE_SIZE", 1000))
+    MAIL_BATCH_SIZE = int(os.environ.get("MAIL_BATCH_SIZE", 50))
+    MAIL_MAX_RETRIES = int(os.environ.get("MAIL_MAX_RETRIES", 5))
+    MAIL_RETRY_BACKOFF = float(os.environ.get("MAIL_RETRY_BACKOFF", 2))
+    MAIL_CONNECTION_IDLE_TIMEOUT = float(os.environ.get("MAIL_CONNECTION_IDLE_TIMEOUT", 30))
+    MAIL_QUEUE_SHUTDOWN_TIMEOUT = float(os.environ.get("MAIL_QUEUE_SHUTDOWN_TIMEOUT", 10))
+
+    # Threads running the Flask app for paths the ASGI app doesn't serve itself
+    ASGI_WSGI_THREADS = int(os.environ.get("ASGI_WSGI_THREADS", 10))
+
+    # Minutes an emailed one-time password stays valid
+    OTP_EXPIRY_MINUTES = int(os.environ.get("OTP_EXPIRY_MINUTES", 10))
 
 class ProductionConfig(Config):
     DEBUG = False
@@ -0,0 +1,133 @@
+"""
+Connection pool settings and live pool metrics.
+
+Pools are per worker process, so the database sees up to
+workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections per deployment.
+GET /db/pool shows an admin the numbers of the worker that answers.
+"""
+from bisect import bisect_left
+from threading import Lock, local
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+import time
+
+
+# Upper bounds in seconds of the checkout wait histogram buckets
+WAIT_BUCKETS = (0.001, 0.01, 0.1, 1.0, 10.0)
+
+
+class PoolStats:
+    """Checkout counters and wait times of one pool"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def record(self, wait, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.wait_buckets[bisect_left(WAIT_BUCKETS, wait)] += 1
+
+    def snapshot(self):
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            labels = [f"le_{bound}s" for bound in WAIT_BUCKETS] + ["inf"]
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / attempts * 1000, 3) if attempts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "wait_histogram": dict(zip(labels, self.wait_buckets)),
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool timing how long each checkout waits for a connection.
+
+    The wait includes opening a new connection when the pool grows. Stats
+    carry over when the pool is recreated, e.g. by engine.dispose().
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+        self._in_get = local()
+
+    def _do_get(self):
+        # QueuePool._do_get retries by calling itself, time only the outer call
+        if getattr(self._in_get, "active", False):
+            return super()._do_get()
+        self._in_get.active = True
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        finally:
+            self._in_get.active = False
+        self.stats.record(time.perf_counter() - start)
+        return record
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def engine_options(config, database_uri=None):
+    """SQLALCHEMY_ENGINE_OPTIONS built from the DB_POOL_* settings.
+
+    In-memory SQLite is left alone, since it runs on a single static
+    connection. DB_STATEMENT_TIMEOUT is applied on PostgreSQL only.
+
+    Args:
+        config: the app config
+        database_uri: URI to build the options for, defaults to SQLALCHEMY_DATABASE_URI
+    """
+    url = make_url(database_uri or config["SQLALCHEMY_DATABASE_URI"])
+    backend = url.get_backend_name()
+    if backend == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": config.get("DB_POOL_SIZE", 5),
+        "max_overflow": config.get("DB_MAX_OVERFLOW", 10),
+        "pool_timeout": config.get("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": config.get("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": config.get("DB_POOL_PRE_PING", True),
+    }
+    statement_timeout = config.get("DB_STATEMENT_TIMEOUT", 0)
+    if statement_timeout and backend == "postgresql":
+        options["connect_args"] = {"options": f"-c statement_timeout={int(statement_timeout)}"}
+    return options
+
+
+def pool_status(engine):
+    """Current occupancy and checkout stats of an engine's pool"""
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            # overflow() counts down from -size while the pool is filling up
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+        )
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        status.update(stats.snapshot())
+    return status
@@ -0,0 +1,186 @@
+"""
+Read replica routing.
+
+With DB_REPLICA_URLS set, every replica becomes a Flask-SQLAlchemy bind
+(replica0, replica1, ...) and RoutingSession sends the reads of GET and
+HEAD requests to one of them. Flushes, INSERT/UPDATE/DELETE statements,
+SELECT ... FOR UPDATE and all other requests use the primary. So does the
+rest of a request once it wrote, and every request of a client that wrote
+less than DB_REPLICA_STICKY_SECONDS ago, so clients read their own writes
+while the replicas catch up. Clients are told apart by JWT identity when
+the route checked a token, and by address otherwise, which behind a proxy
+needs TRUSTED_PROXIES so it isn't the proxy's address for every client.
+
+The replicas don't have to be real ones to try this locally: a copy of
+the SQLite file, or a second local PostgreSQL database, works as well.
+"""
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from threading import Lock
+import itertools
+import time
+
+
+REPLICA_STRATEGIES = ("round_robin", "latency")
+
+# Weight of the newest statement in a replica's moving average latency
+LATENCY_SMOOTHING = 0.2
+
+# With the latency strategy every so many reads still go round robin, so a
+# replica that was slow once gets measured again
+LATENCY_PROBE_EVERY = 20
+
+
+def replica_binds(config):
+    """SQLALCHEMY_BINDS entries for the DB_REPLICA_URLS, with the pool settings"""
+    from volumx.db_pool import engine_options
+
+    return {
+        f"replica{i}": {"url": url, **engine_options(config, url)}
+        for i, url in enumerate(config.get("DB_REPLICA_URLS") or [])
+    }
+
+
+class ReplicaRouter:
+    """Picks the replica a read goes to and tracks replica latency"""
+
+    def __init__(self):
+        self._counter = itertools.count()
+        self._lock = Lock()
+        self.latency = {}
+        self.reads = {}
+
+    def init_app(self, app, db):
+        """Time the replica engines of an app and enable routing for it"""
+        strategy = app.config.get("DB_REPLICA_STRATEGY", "round_robin")
+        if strategy not in REPLICA_STRATEGIES:
+            raise ValueError(f"Unknown replica strategy: {strategy}")
+
+        with app.app_context():
+            engines = [db.engines[key] for key in replica_binds(app.config)]
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", _start_timer)
+            event.listen(engine, "after_cursor_execute", self._record_latency)
+        app.extensions["db_replicas"] = engines
+
+    def choose(self, engines, strategy):
+        """The replica engine for the next read"""
+        turn = next(self._counter)
+        if strategy == "latency" and turn % LATENCY_PROBE_EVERY:
+            return min(engines, key=lambda engine: self.latency.get(engine, 0.0))
+        return engines[turn % len(engines)]
+
+    def _record_latency(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._replica_timer
+        engine = conn.engine
+        with self._lock:
+            average = self.latency.get(engine)
+            self.latency[engine] = elapsed if average is None else average + LATENCY_SMOOTHING * (elapsed - average)
+            self.reads[engine] = self.reads.get(engine, 0) + 1
+
+    def status(self, engine):
+        """Statements run on a replica and their moving average latency"""
+        with self._lock:
+            return {
+                "reads": self.reads.get(engine, 0),
+                "latency_ms": round(self.latency.get(engine, 0.0) * 1000, 3),
+            }
+
+
+replica_router = ReplicaRouter()
+
+
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    context._replica_timer = time.perf_counter()
+
+
+def replicas_enabled():
+    return bool(current_app.extensions.get("db_replicas"))
+
+
+def sticky_seconds():
+    """How long reads stay on the primary after a write, 0 without replicas"""
+    if not replicas_enabled():
+        return 0
+    return current_app.config.get("DB_REPLICA_STICKY_SECONDS", 5)
+
+
+def use_primary():
+    """Send the rest of the current request's reads to the primary"""
+    g.db_primary = True
+
+
+def client_key():
+    """The JWT identity of the request if a token was checked, else the address"""
+    try:
+        identity = get_jwt_identity()
+    except RuntimeError:
+        identity = None
+    if identity is not None:
+        return f"user:{identity}"
+    return f"addr:{request.remote_addr}"
+
+
+def _sticky_key():
+    return f"db_sticky:{client_key()}"
+
+
+def _mark_client_wrote():
+    from volumx.cache_utils import _cache_set
+
+    seconds = sticky_seconds()
+    if seconds > 0:
+        _cache_set(_sticky_key(), True, timeout=seconds)
+
+
+def _client_recently_wrote():
+    from volumx import cache
+
+    return sticky_seconds() > 0 and bool(cache.get(_sticky_key()))
+
+
+def _reads_from_replica(session, clause):
+    if session.info.get("wrote") or not has_request_context() or request.method not in ("GET", "HEAD"):
+        return False
+    if clause is not None and (getattr(clause, "is_dml", False) or getattr(clause, "_for_update_arg", None) is not None):
+        return False
+    if "db_primary" not in g:
+        g.db_primary = _client_recently_wrote()
+    return not g.db_primary
+
+
+class RoutingSession(Session):
+    """Session sending the reads of GET requests to a replica.
+
+    One replica serves all of a session's replica reads, so a request sees
+    a single consistent snapshot.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_request_context():
+            engines = current_app.extensions.get("db_replicas")
+            if engines and _reads_from_replica(self, clause):
+                if "replica" not in self.info:
+                    strategy = current_app.config.get("DB_REPLICA_STRATEGY", "round_robin")
+                    self.info["replica"] = replica_router.choose(engines, strategy)
+                return self.info["replica"]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _after_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _after_write_statement(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _after_commit(session):
+    if session.info.get("wrote") and has_request_context() and replicas_enabled():
+        _mark_client_wrote()
@@ -1,4 +1,134 @@
 from volumx import db
+from flask import current_app, request, url_for, g, has_request_context
+from sqlalchemy import tuple_, inspect
+from sqlalchemy.orm import joinedload, selectinload, subqueryload, lazyload
+from datetime import datetime
+import base64
+import json
+import re
+import sqlite3
+
+
+# Relationship loading strategies that can be picked from config
+LOADING_STRATEGIES = {
+    "joined": joinedload,
+    "selectin": selectinload,
+    "subquery": subqueryload,
+    "lazy": lazyload,
+}
+
+
+def eager_chain(*path, strategy="joined"):
+    """Build a loader option that follows a chain of relationships.
+
+    Args:
+        path: relationship attributes to follow, e.g. Business.contact, Contact.address
+        strategy: one of LOADING_STRATEGIES
+
+    Returns:
+        a loader option to pass to query.options()
+    """
+    if strategy not in LOADING_STRATEGIES:
+        raise ValueError(f"Unknown loading strategy: {strategy}")
+    option = LOADING_STRATEGIES[strategy](path[0])
+    for attr in path[1:]:
+        option = getattr(option, f"{strategy}load")(attr)
+    return option
+
+
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """connect listener: SQLite only enforces foreign keys, and so only runs
+    ON DELETE CASCADE, when asked to on each connection"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+class SchemaVersionError(RuntimeError):
+    """The database isn't migrated to the revision the code expects"""
+
+
+def check_schema_version(app, migrations_dir):
+    """Compare the database's Alembic revision with the migrations head.
+
+    This replaces running create_all on every boot, which reflects every
+    table: a database at the head revision costs a single query. An empty
+    database gets the tables from the models and is stamped at the head, so
+    fresh development databases still work. Any other mismatch, tables
+    without a revision included, means `flask db upgrade` has not been run
+    and the app would fail on its first queries, so it raises
+    SchemaVersionError. With DEBUG on, and for commands of the flask CLI,
+    which must load the app to migrate it, the mismatch is only logged.
+
+    Args:
+        app: the Flask app, used for the engine and the logger
+        migrations_dir: the Alembic migrations directory
+    """
+    from alembic.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+    import click
+
+    script = ScriptDirectory(migrations_dir)
+    head = script.get_current_head()
+    with app.app_context(), db.engine.begin() as connection:
+        context = MigrationContext.configure(connection)
+        current = context.get_current_revision()
+        if current == head:
+            return
+        if current is None and not inspect(connection).get_table_names():
+            db.metadata.create_all(connection)
+            context.stamp(script, head)
+            return
+    message = f"Database schema is at revision {current} but the code expects {head}, run `flask db upgrade`"
+    if app.debug or click.get_current_context(silent=True) is not None:
+        app.logger.warning(message)
+        return
+    raise SchemaVersionError(message)
+
+
+def in_unit_of_work():
+    """Whether the current request batches its writes into one transaction"""
+    return has_request_context() and g.get("unit_of_work", False)
+
+
+def commit_or_flush():
+    """Commit the session, or only flush it inside a unit of work.
+
+    Flushing still sends the pending statements, so constraint errors surface
+    where the write happens, but the commit is left to finish_unit_of_work.
+    """
+    if in_unit_of_work():
+        db.session.flush()
+    else:
+        db.session.commit()
+
+
+def after_commit(callback):
+    """Run callback once the unit of work commits, or right away outside one"""
+    if in_unit_of_work():
+        g.after_commit.append(callback)
+    else:
+        callback()
+
+
+def begin_unit_of_work():
+    """before_request hook: start batching the request's writes"""
+    g.unit_of_work = True
+    g.after_commit = []
+
+
+def finish_unit_of_work(response):
+    """after_request hook: commit once if the request succeeded, else roll back"""
+    g.unit_of_work = False
+    if response.status_code < 400:
+        db.session.commit()
+        for callback in g.pop("after_commit", []):
+            callback()
+    else:
+        db.session.rollback()
+    return response
+
 
 def query_one_filtered(table, **kwargs):
     """Query a single item from the table based on filters."""
@@ -20,13 +150,149 @@ def query_all(table):
     return db.session.query(table).all()
 
 
+def query_existing(column, values, chunk_size=500):
+    """Which of the given values already exist in a column.
+
+    Runs one IN query per chunk of values instead of one query per value.
+
+    Returns:
+        set of the values found
+    """
+    values = list(set(values))
+    found = set()
+    for start in range(0, len(values), chunk_size):
+        chunk = values[start:start + chunk_size]
+        found.update(value for (value,) in db.session.query(column).filter(column.in_(chunk)))
+    return found
+
+
+# Where SQLite and PostgreSQL name the column of a failed unique constraint
+UNIQUE_VIOLATION_PATTERNS = [
+    re.compile(r"UNIQUE constraint failed: \w+\.(\w+)"),
+    re.compile(r'Key \("?(\w+)"?\)=\(.*\) already exists'),
+]
+
+
+def unique_violation_field(error):
+    """Column whose unique constraint an IntegrityError broke.
+
+    Returns:
+        the column name, or None if the error is not a unique violation
+    """
+    message = str(error.orig)
+    for pattern in UNIQUE_VIOLATION_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return match.group(1)
+    return None
+
+
 def query_paginated(table, page):
     """Query paginated items from the table."""
     per_page = 10
-    return db.session.query(table).order_by(table.createdAt.desc()).paginate(page, per_page, False)
+    return db.session.query(table).order_by(table.createdAt.desc()).paginate(page=page, per_page=per_page, error_out=False)
 
 
 def query_paginate_filtered(table, page, **kwargs):
     """Query paginated items from the table based on filters."""
     per_page = 10
-    return db.session.query(table).filter_by(**kwargs).order_by(table.createdAt.desc()).paginate(page, per_page, False, 10)
\ No newline at end of file
+    return db.session.query(table).filter_by(**kwargs).order_by(table.createdAt.desc()).paginate(page=page, per_page=per_page, error_out=False, max_per_page=10)
+
+
+def encode_cursor(created_at, row_id):
+    """Turn the (createdAt, id) of the last row on a page into an opaque token."""
+    raw = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Reverse encode_cursor. Raises ValueError if the token is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(row_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def page_args():
+    """Read the limit and cursor query parameters of the current request.
+
+    Returns:
+        (limit, cursor) with limit clamped to PAGINATION_MAX_LIMIT
+    """
+    default_limit = current_app.config.get("PAGINATION_DEFAULT_LIMIT", 50)
+    max_limit = current_app.config.get("PAGINATION_MAX_LIMIT", 500)
+    limit = request.args.get("limit", default_limit, type=int)
+    limit = max(1, min(limit, max_limit))
+    return limit, request.args.get("cursor")
+
+
+def query_keyset(query, table, limit, cursor=None):
+    """Fetch one page of a query ordered newest first on (createdAt, id).
+
+    Unlike OFFSET paging the database seeks straight to the cursor position,
+    so every page costs the same as the first one.
+
+    Args:
+        query: the query to page through
+        table: model whose createdAt and id columns drive the ordering
+        limit: page size
+        cursor: token returned for the previous page, or None for the first page
+
+    Returns:
+        (rows, next_cursor) where next_cursor is None on the last page
+    """
+    return keyset_rows(keyset_page(query, table, limit, cursor).all(), limit)
+
+
+def keyset_page(query, table, limit, cursor=None):
+    """Order, seek and limit a Query or select() for one keyset page.
+
+    Fetches one row more than the limit so keyset_rows can tell whether
+    there is a next page.
+
+    Raises:
+        ValueError: if the cursor is invalid
+    """
+    query = query.order_by(table.createdAt.desc(), table.id.desc())
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(table.createdAt, table.id) < (created_at, row_id))
+    return query.limit(limit + 1)
+
+
+def keyset_rows(rows, limit):
+    """Split the rows of a keyset_page query into (rows, next_cursor)"""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].createdAt, rows[-1].id)
+    return rows, next_cursor
+
+
+def next_page_headers(next_cursor, limit):
+    """Link header pointing at the next page of the current endpoint."""
+    if not next_cursor:
+        return {}
+    args = dict(request.view_args or {}, **request.args.to_dict())
+    args.update(cursor=next_cursor, limit=limit)
+    next_url = url_for(request.endpoint, _external=True, **args)
+    return {"Link": f'<{next_url}>; rel="next"', "X-Next-Cursor": next_cursor}
+
+
+def change_marker(count, *timestamps):
+    """Summarize a set of rows by their count and newest updatedAt.
+
+    Used as the validator for conditional GETs: inserts and deletes change the
+    count and updates move the newest timestamp.
+
+    Returns:
+        (fingerprint, last_modified), or None when there are no rows
+    """
+    if not count:
+        return None
+    timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+    last_modified = max(timestamps) if timestamps else None
+    fingerprint = f"{count}:{last_modified.isoformat() if last_modified else ''}"
+    return fingerprint, last_modified
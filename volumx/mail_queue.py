@@ -0,0 +1,181 @@
+from contextlib import ExitStack
+from threading import Condition, Lock, Thread
+import atexit
+import heapq
+import itertools
+import logging
+import os
+import queue
+import random
+import smtplib
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class MailQueueFull(Exception):
+    """Raised when a message can't be queued because the queue is full"""
+
+
+class MailQueue:
+    """Sends Flask-Mail messages from a background thread.
+
+    Requests only put a message on an in-process queue. The sender thread
+    takes up to `batch_size` queued messages at a time and sends them over
+    one SMTP connection, which stays open until it has been idle for
+    `idle_timeout` seconds. A message that fails with a temporary error
+    (connection problems, 4xx replies) is retried after
+    retry_backoff * 2 ** attempt seconds with some jitter, at most
+    `max_retries` times. Permanent failures are logged and dropped.
+    """
+
+    def __init__(self, mail, maxsize=1000, batch_size=50, max_retries=5, retry_backoff=2, idle_timeout=30):
+        self.mail = mail
+        self.app = None
+        self._lock = Lock()
+        self._idle = Condition()
+        self._pending = 0
+        self._thread = None
+        self._thread_pid = None
+        self._order = itertools.count()
+        self.shutdown_timeout = 10
+        self.configure(maxsize, batch_size, max_retries, retry_backoff, idle_timeout)
+        # Once per queue, however many apps init_app binds it to
+        atexit.register(self._flush_at_exit)
+
+    def configure(self, maxsize, batch_size, max_retries, retry_backoff, idle_timeout):
+        """Set the queue size, batching and retry policy"""
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.idle_timeout = idle_timeout
+        self._queue = queue.Queue(maxsize)
+        self._retries = []
+
+    def init_app(self, app):
+        """Bind the queue to an app, configured from its MAIL_QUEUE_* settings"""
+        self.app = app
+        self.configure(
+            maxsize=app.config.get('MAIL_QUEUE_SIZE', 1000),
+            batch_size=app.config.get('MAIL_BATCH_SIZE', 50),
+            max_retries=app.config.get('MAIL_MAX_RETRIES', 5),
+            retry_backoff=app.config.get('MAIL_RETRY_BACKOFF', 2),
+            idle_timeout=app.config.get('MAIL_CONNECTION_IDLE_TIMEOUT', 30),
+        )
+        self.shutdown_timeout = app.config.get('MAIL_QUEUE_SHUTDOWN_TIMEOUT', 10)
+
+    def enqueue(self, message):
+        """Queue a message for sending and return immediately.
+
+        Raises:
+            MailQueueFull: if the queue is at its maximum size
+        """
+        self._ensure_sender()
+        with self._idle:
+            self._pending += 1
+        try:
+            self._queue.put_nowait((0, message))
+        except queue.Full:
+            self._done()
+            raise MailQueueFull("Mail queue is full")
+
+    def flush(self, timeout=None):
+        """Wait until every queued message was sent or given up on.
+
+        Returns:
+            True if the queue drained within the timeout
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def _flush_at_exit(self):
+        """Give queued mail shutdown_timeout seconds to go out before exit"""
+        self.flush(self.shutdown_timeout)
+
+    def _done(self):
+        with self._idle:
+            self._pending -= 1
+            if self._pending == 0:
+                self._idle.notify_all()
+
+    def _ensure_sender(self):
+        # Started lazily and again after a fork, since threads don't survive it
+        with self._lock:
+            if self._thread is None or self._thread_pid != os.getpid() or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, name='mail-sender', daemon=True)
+                self._thread_pid = os.getpid()
+                self._thread.start()
+
+    def _next_batch(self, timeout):
+        """Up to batch_size messages due now, waiting at most timeout for the first"""
+        batch = []
+        now = time.monotonic()
+        while self._retries and self._retries[0][0] <= now and len(batch) < self.batch_size:
+            _, _, attempt, message = heapq.heappop(self._retries)
+            batch.append((attempt, message))
+
+        if not batch:
+            if self._retries:
+                timeout = min(timeout, self._retries[0][0] - now)
+            try:
+                batch.append(self._queue.get(timeout=max(timeout, 0)))
+            except queue.Empty:
+                return batch
+
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        with self.app.app_context(), ExitStack() as connection:
+            host = None
+            while True:
+                batch = self._next_batch(self.idle_timeout)
+                if not batch:
+                    # Idle: let the SMTP connection go until there's mail again
+                    _close(connection)
+                    host = None
+                    continue
+
+                for attempt, message in batch:
+                    try:
+                        if host is None:
+                            host = connection.enter_context(self.mail.connect())
+                        host.send(message)
+                    except Exception as e:
+                        _close(connection)
+                        host = None
+                        self._retry(attempt, message, e)
+                    else:
+                        self._done()
+
+    def _retry(self, attempt, message, error):
+        if not _is_temporary(error) or attempt >= self.max_retries:
+            logger.error("Giving up on mail to %s after %d attempts: %s", message.recipients, attempt + 1, error)
+            self._done()
+            return
+
+        delay = self.retry_backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+        logger.warning("Mail to %s failed, retrying in %.1fs: %s", message.recipients, delay, error)
+        heapq.heappush(self._retries, (time.monotonic() + delay, next(self._order), attempt + 1, message))
+
+
+def _close(connection):
+    """Quit the SMTP connection, which may already be dead"""
+    try:
+        connection.close()
+    except (smtplib.SMTPException, OSError):
+        pass
+
+
+def _is_temporary(error):
+    """Whether sending may succeed if tried again later"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return False
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPException, OSError))
@@ -3,8 +3,11 @@
 Base template for the Event driven application
 """
 from volumx import db
-from uuid import uuid4
+from volumx.db_utils import commit_or_flush
+from uuid import UUID as PyUUID, uuid4
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.types import LargeBinary, TypeDecorator
+from werkzeug.routing import BaseConverter, ValidationError
 from datetime import datetime
 
 
@@ -13,6 +16,67 @@ def get_uuid():
     return uuid4().hex
 
 
+class HexUUID(TypeDecorator):
+    """UUID stored natively on PostgreSQL and as 16 bytes elsewhere.
+
+    Python code and the API keep seeing 32 character hex strings. A string
+    that isn't a UUID binds as the nil UUID, which uuid4 never generates, so
+    looking up a malformed id finds nothing, like it did with string ids.
+    """
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(UUID(as_uuid=True))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, PyUUID):
+            try:
+                value = PyUUID(str(value))
+            except ValueError:
+                value = PyUUID(int=0)
+        return value if dialect.name == "postgresql" else value.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, bytes):
+            return PyUUID(bytes=value).hex
+        return PyUUID(str(value)).hex
+
+
+def canonical_id(value):
+    """The 32 character hex form ids come back from the database in.
+
+    Cache resource names and the principal cache are keyed by ids, so ids
+    taken from a request go through this first. A value that isn't a UUID
+    is returned as is.
+    """
+    try:
+        return PyUUID(str(value)).hex
+    except ValueError:
+        return value
+
+
+class HexUUIDConverter(BaseConverter):
+    """URL converter for ids: any UUID spelling, e.g. with hyphens or in
+    upper case, reaches the view as the canonical hex form, and anything
+    else is a 404."""
+
+    def to_python(self, value):
+        try:
+            return PyUUID(value).hex
+        except ValueError:
+            raise ValidationError()
+
+    def to_url(self, value):
+        return canonical_id(value)
+
+
 # Create a base model class that will contain common functionality
 class BaseModel(db.Model):
     """BaseClass for all models"""
@@ -21,7 +85,7 @@ class BaseModel(db.Model):
     __abstract__ = True
 
     # Define a primary key column with a default value of a generated UUID
-    id = db.Column(db.String(255), primary_key=True, unique=True, nullable=False)
+    id = db.Column(HexUUID, primary_key=True, unique=True, nullable=False)
     createdAt = db.Column(db.TIMESTAMP, server_default=db.func.current_timestamp(), nullable=False)
     updatedAt = db.Column(db.TIMESTAMP, server_default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
     
@@ -36,17 +100,17 @@ class BaseModel(db.Model):
     def insert(self):
         """Insert the current object into the database"""
         db.session.add(self)
-        db.session.commit()
+        commit_or_flush()
 
     def update(self):
         """Update the current object in the database"""
         self.updatedAt = datetime.now()
-        db.session.commit()
+        commit_or_flush()
 
     def delete(self):
         """Delete the current object from the database"""
         db.session.delete(self)
-        db.session.commit()
+        commit_or_flush()
 
     def format(self):
         """Format the object's attributes as a dictionary"""
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 from volumx import db
-from volumx.models.base import BaseModel
+from volumx.models.base import BaseModel, HexUUID
 from volumx.models.user import User
 
 class Address(BaseModel):
@@ -22,12 +22,14 @@ class Contact(BaseModel):
     email = db.Column(db.String(255), nullable=False, unique=True)
     phoneCode = db.Column(db.Integer, nullable=False, unique=False)
     phoneNumber = db.Column(db.Integer, nullable=False, unique=True)
-    addressId = db.Column(db.String(50), db.ForeignKey('address.id'))
-    address = db.relationship('Address', backref='contact', uselist=False)
+    addressId = db.Column(HexUUID, db.ForeignKey('address.id', ondelete='CASCADE'), index=True)
+    address = db.relationship('Address', backref=db.backref('contact', passive_deletes=True), uselist=False)
 
 class Business(BaseModel):
     """Template for the Business Class"""
     __tablename__ = 'business'
+    # Keyset pagination orders by (createdAt, id)
+    __table_args__ = (db.Index('ix_business_createdAt_id', 'createdAt', 'id'),)
 
     legalName = db.Column(db.String(50), nullable=False, unique=True)
     displayName = db.Column(db.String(50), nullable=False, unique=True)
@@ -38,16 +40,19 @@ class Business(BaseModel):
     businessPan = db.Column(db.String(50), nullable=False, unique=False)
     businessLogo = db.Column(db.String(255), nullable=False, unique=False)
     orderSystem = db.Column(db.Boolean, default=True)
-    contactId = db.Column(db.String, db.ForeignKey('contact.id'))
-    contact = db.relationship('Contact', backref='business', uselist=False)
+    contactId = db.Column(HexUUID, db.ForeignKey('contact.id', ondelete='CASCADE'), index=True)
+    contact = db.relationship('Contact', backref=db.backref('business', passive_deletes=True), uselist=False)
 
 
 class BusinessUserRights(BaseModel):
     """Template for the BusinessUserRights Class"""
     __tablename__ = 'business_user_rights'
+    # The primary key leads with the inherited id column, so lookups by
+    # business, by user and by both need their own indexes
+    __table_args__ = (db.Index('ix_business_user_rights_businessId_userId', 'businessId', 'userId'),)
 
-    businessId = db.Column(db.String(50), db.ForeignKey('business.id'),primary_key=True)
-    userId = db.Column(db.String(50), db.ForeignKey('users.id'),primary_key=True)
+    businessId = db.Column(HexUUID, db.ForeignKey('business.id', ondelete='CASCADE'),primary_key=True)
+    userId = db.Column(HexUUID, db.ForeignKey('users.id', ondelete='CASCADE'),primary_key=True, index=True)
     productRights = db.Column(db.Boolean, default=True, nullable=False, unique=False)
     inventoryRights = db.Column(db.Boolean, default=True, nullable=False, unique=False)
     salesRights = db.Column(db.Boolean, default=True, nullable=False, unique=False)
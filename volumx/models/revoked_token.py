@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""Template for the RevokedToken Class"""
+from volumx import db
+
+
+class RevokedToken(db.Model):
+    """A JWT revoked before its expiry, kept until it would have expired.
+
+    Rows get an increasing integer id instead of a uuid so each worker can
+    fetch just the revocations added since its last sync.
+    """
+    __tablename__ = 'revoked_tokens'
+    # Keep SQLite from reusing the ids of pruned rows, which workers that
+    # already synced past them would never see
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<RevokedToken {self.jti}>'
@@ -2,11 +2,46 @@
 """Template for the User Class"""
 from volumx import db
 from flask_login import UserMixin
+from sqlalchemy import DDL, event
 from volumx.models.base import BaseModel
 
 
+# Columns the user search matches by prefix
+SEARCH_COLUMNS = ('email', 'first_name', 'last_name')
+
+# SQLite has no operator classes for prefix LIKE on lower(), so search goes
+# through an FTS5 index kept in sync with the users table by triggers. The
+# user id is stored unindexed so matches join back without relying on rowids,
+# which VACUUM may renumber on a table without an integer primary key.
+USERS_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "id UNINDEXED, email, first_name, last_name, prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts (id, email, first_name, last_name) "
+    "VALUES (new.id, new.email, new.first_name, new.last_name); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN "
+    "DELETE FROM users_fts WHERE id = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF email, first_name, last_name ON users BEGIN "
+    "UPDATE users_fts SET email = new.email, first_name = new.first_name, last_name = new.last_name "
+    "WHERE id = old.id; END",
+]
+
+
 class User(UserMixin, BaseModel):
     __tablename__ = 'users'
+    # Prefix search indexes. text_pattern_ops lets PostgreSQL use them for
+    # LIKE 'abc%' whatever the database collation; other dialects ignore it.
+    __table_args__ = tuple(
+        db.Index(
+            f'ix_users_{column}_lower',
+            db.func.lower(db.column(column)).label(f'{column}_lower'),
+            postgresql_ops={f'{column}_lower': 'text_pattern_ops'},
+        )
+        for column in SEARCH_COLUMNS
+    ) + (
+        # Keyset pagination orders by (createdAt, id)
+        db.Index('ix_users_createdAt_id', 'createdAt', 'id'),
+    )
 
     email = db.Column(db.String(255), unique=True, nullable=False)
     first_name = db.Column(db.String(255), nullable=False)
@@ -20,7 +55,8 @@ class User(UserMixin, BaseModel):
     is_admin = db.Column(db.Boolean, default=False)
 
     # Relationship with BusinessUserRights (One-to-One)
-    business_user_rights = db.relationship('BusinessUserRights', backref='user', uselist=False)
+    # Rights rows are removed by the ON DELETE CASCADE foreign key
+    business_user_rights = db.relationship('BusinessUserRights', backref='user', uselist=False, passive_deletes=True)
 
 
     def __init__(self, email, first_name, last_name, password, email_confirmed=False, otp=None, otp_expiry=None, profile_picture='http://res.cloudinary.com/dbn9ejpno/image/upload/v1700666059/iuqjx3u5ts4tpvofhdnn.png', is_active=True, is_admin=False):
@@ -52,4 +88,8 @@ class User(UserMixin, BaseModel):
             'is_admin': self.is_admin,
             'createdAt': self.createdAt,
             'updatedAt': self.updatedAt,
-        }
\ No newline at end of file
+        }
+
+
+for statement in USERS_FTS_DDL:
+    event.listen(User.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
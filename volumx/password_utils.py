@@ -0,0 +1,90 @@
+from concurrent.futures import ProcessPoolExecutor
+from threading import BoundedSemaphore, Lock
+from werkzeug.security import generate_password_hash, check_password_hash
+import os
+
+
+# Defaults of the PASSWORD_HASH_* settings, also used by Config
+DEFAULT_METHOD = "scrypt"
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_PENDING = 8
+DEFAULT_QUEUE_TIMEOUT = 5
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when no hashing slot frees up within the queue timeout"""
+
+
+class PasswordHasher:
+    """Runs password hashing in a bounded process pool.
+
+    Hashing is CPU bound and slow by design, so doing it inline ties up the
+    request worker. Here at most `workers` hashes run at once and up to
+    `max_pending` more wait for a slot. A request that finds the queue full,
+    or waits longer than `queue_timeout` seconds for a slot, gets
+    PasswordHashingBusy. With workers=0 hashes run inline, one at a time.
+    """
+
+    def __init__(self, method=DEFAULT_METHOD, workers=DEFAULT_WORKERS, max_pending=DEFAULT_MAX_PENDING,
+                 queue_timeout=DEFAULT_QUEUE_TIMEOUT):
+        self._lock = Lock()
+        self._executor = None
+        self._executor_pid = None
+        self.configure(method, workers, max_pending, queue_timeout)
+
+    def configure(self, method, workers, max_pending, queue_timeout):
+        """Set the algorithm/cost (a Werkzeug method string) and pool limits"""
+        with self._lock:
+            self.method = method
+            self.workers = workers
+            self.queue_timeout = queue_timeout
+            self._slots = BoundedSemaphore(max(workers, 1))
+            self._admission = BoundedSemaphore(max(workers, 1) + max_pending)
+            self._method_prefix = None
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _get_executor(self):
+        # The pool is created lazily and again after a fork, so a preloaded
+        # app never shares its parent's worker processes
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _run(self, func, *args):
+        admission, slots = self._admission, self._slots
+        if not admission.acquire(blocking=False):
+            raise PasswordHashingBusy("Password hashing queue is full")
+        try:
+            if not slots.acquire(timeout=self.queue_timeout):
+                raise PasswordHashingBusy("Timed out waiting for password hashing")
+            try:
+                if not self.workers:
+                    return func(*args)
+                return self._get_executor().submit(func, *args).result()
+            finally:
+                slots.release()
+        finally:
+            admission.release()
+
+    def hash(self, password):
+        """Hash a password with the configured method"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        """Check a password against a stored hash"""
+        return self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        """Whether a stored hash was made with other parameters than configured"""
+        if self._method_prefix is None:
+            # Werkzeug expands short methods such as "pbkdf2" into their full
+            # parameters, so compare against what it actually stores
+            self._method_prefix = generate_password_hash("", self.method).split("$", 1)[0]
+        return stored_hash.split("$", 1)[0] != self._method_prefix
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,128 @@
+"""
+Per-request SQL statistics.
+
+Every statement run while handling a request is counted and timed on all
+engines, replicas included. The response gets a Server-Timing header with
+the query count, the total database time and the slowest statement's time,
+and one JSON line is logged per request on the volumx.query_stats logger
+at INFO. Streamed responses only count the statements run before the body
+starts streaming.
+
+The logger's level is QUERY_STATS_LOG_LEVEL (WARNING keeps only the N+1
+warnings). Unless logging is already configured, e.g. with a handler on the
+root logger, its records go to stderr, which gunicorn and Render collect
+with the rest of the worker output.
+
+The same statement shape running more than N_PLUS_ONE_THRESHOLD times in
+one request usually means rows are loaded one by one in a loop. It is
+logged as a warning, and with TESTING on it raises NPlusOneDetected so the
+test that hit it fails.
+"""
+from collections import Counter
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+import json
+import logging
+import re
+import time
+
+
+logger = logging.getLogger(__name__)
+
+# Expanded IN lists, written as (?, ?, ?) or (%(id_1_1)s, %(id_1_2)s)
+_IN_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s)(?:\s*,\s*(?:\?|%\(\w+\)s))*\s*\)")
+
+
+class NPlusOneDetected(Exception):
+    """Raised in testing when one request repeats a statement too often"""
+
+
+def statement_shape(statement):
+    """The statement with IN lists collapsed, so their length doesn't matter"""
+    return _IN_LIST.sub("(?)", " ".join(statement.split()))
+
+
+class QueryStats:
+    """Statements run by one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement = None
+        self.shapes = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.total += duration
+        if duration > self.slowest:
+            self.slowest = duration
+            self.slowest_statement = statement
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold):
+        """(shape, count) of the statements run more than threshold times"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+    def server_timing(self):
+        return (
+            f'db;desc="{self.count} queries";dur={self.total * 1000:.2f}, '
+            f"db-slowest;dur={self.slowest * 1000:.2f}"
+        )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_stats_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context():
+        return
+    if "query_stats" not in g:
+        g.query_stats = QueryStats()
+    g.query_stats.record(statement, time.perf_counter() - context._query_stats_start)
+
+
+def report_query_stats(response):
+    """after_request hook: add Server-Timing, log the stats, flag N+1 patterns"""
+    stats = g.pop("query_stats", None) or QueryStats()
+    response.headers.add("Server-Timing", stats.server_timing())
+    logger.info(json.dumps({
+        "method": request.method,
+        "path": request.path,
+        "status": response.status_code,
+        "queries": stats.count,
+        "db_ms": round(stats.total * 1000, 2),
+        "slowest_ms": round(stats.slowest * 1000, 2),
+        "slowest_sql": stats.slowest_statement,
+    }))
+
+    threshold = current_app.config.get("N_PLUS_ONE_THRESHOLD", 10)
+    repeated = stats.repeated(threshold) if threshold > 0 else []
+    for shape, count in repeated:
+        logger.warning("%s %s ran the same statement %d times: %s", request.method, request.path, count, shape)
+    if repeated and current_app.testing:
+        shape, count = repeated[0]
+        raise NPlusOneDetected(f"{request.method} {request.path} ran the same statement {count} times: {shape}")
+    return response
+
+
+def _configure_logger(level):
+    logger.setLevel(level)
+    # Python's fallback handler only shows warnings, so without logging
+    # configured the per-request lines would be dropped
+    if not logger.hasHandlers():
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("[%(asctime)s] %(levelname)s in %(name)s: %(message)s"))
+        logger.addHandler(handler)
+
+
+def init_query_stats(app, db):
+    """Time the statements of every engine of an app and report per request"""
+    _configure_logger(app.config.get("QUERY_STATS_LOG_LEVEL", "INFO"))
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    app.after_request(report_query_stats)
@@ -0,0 +1,239 @@
+"""
+Column-projection serializers for the read routes.
+
+Each resource declares the columns it returns and how they nest. A query
+built from a serializer selects just those columns as tuples, so rows never
+get hydrated into mapped instances, and the row -> dict mapping is compiled
+once when the serializer is defined instead of on every request.
+"""
+from functools import lru_cache
+from operator import itemgetter
+from sqlalchemy import select
+from volumx import db
+from volumx.models.business import Business, Contact, Address, BusinessUserRights
+from volumx.models.user import User
+
+
+class Serializer:
+    """Turns rows selected from a fixed set of columns into (nested) dicts"""
+
+    def __init__(self, model, fields, joins=()):
+        """constructor for the serializer
+
+        Args:
+            model: root model the query selects from
+            fields: output key -> column, or output key -> nested dict of the same
+            joins: (model, onclause) pairs outer joined onto the root model, in
+                the order they depend on each other
+        """
+        self.model = model
+        self.fields = fields
+        self.joins = joins
+        self.columns = []
+        self._build = self._compile(fields)
+
+    def _compile(self, fields):
+        """Precompute the row positions for one level of the output dict"""
+        keys, positions, nested = [], [], []
+        for key, value in fields.items():
+            if isinstance(value, dict):
+                nested.append((key, self._compile(value)))
+            else:
+                keys.append(key)
+                positions.append(len(self.columns))
+                self.columns.append(value)
+
+        if len(positions) == 1:
+            position = positions[0]
+            getter = lambda row: (row[position],)
+        elif positions:
+            getter = itemgetter(*positions)
+        else:
+            getter = lambda row: ()
+
+        def build(row):
+            data = dict(zip(keys, getter(row)))
+            for key, build_nested in nested:
+                data[key] = build_nested(row)
+            return data
+
+        return build
+
+    def _labeled_columns(self):
+        columns = [column.label(f"_{i}") for i, column in enumerate(self.columns)]
+        return columns + [self.model.id.label("id"), self.model.createdAt.label("createdAt")]
+
+    def query(self):
+        """Query selecting only this serializer's columns.
+
+        The root model's id and createdAt are appended under those labels so
+        the rows can be paged with db_utils.query_keyset.
+        """
+        query = db.session.query(*self._labeled_columns()).select_from(self.model)
+        for model, onclause in self.joins:
+            query = query.outerjoin(model, onclause)
+        return query
+
+    def select(self):
+        """Same as query() as a select() statement, e.g. for an AsyncSession"""
+        statement = select(*self._labeled_columns()).select_from(self.model)
+        for model, onclause in self.joins:
+            statement = statement.outerjoin(model, onclause)
+        return statement
+
+    @lru_cache(maxsize=128)
+    def subset(self, paths):
+        """Serializer limited to some of the fields.
+
+        Only the columns of the picked fields are selected, and joins past the
+        last table still referenced are dropped, so e.g. a business subset
+        without contact.address.* never touches the address table.
+
+        Args:
+            paths: frozenset of dotted field paths. "contact" or "contact.*"
+                picks a whole nested object, "contact.email" a single field.
+
+        Raises:
+            ValueError: if a path does not name a field
+        """
+        fields = _pick(self.fields, [path.split(".") for path in paths])
+        models = {column.class_ for column in _flatten(fields)}
+        needed = [i for i, (model, _) in enumerate(self.joins) if model in models]
+        joins = self.joins[:needed[-1] + 1] if needed else ()
+        return Serializer(self.model, fields, joins)
+
+    def to_dict(self, row):
+        """Format a single row"""
+        return self._build(row)
+
+    def to_list(self, rows):
+        """Format a list of rows"""
+        build = self._build
+        return [build(row) for row in rows]
+
+
+def _flatten(fields):
+    """All columns of a (nested) field mapping"""
+    for value in fields.values():
+        if isinstance(value, dict):
+            yield from _flatten(value)
+        else:
+            yield value
+
+
+def _pick(fields, paths, prefix=""):
+    """Keep the parts of a field mapping named by the split paths, in declaration order"""
+    wanted = {}
+    for path in paths:
+        key, rest = path[0], path[1:]
+        if key == "*" and not rest:
+            return dict(fields)
+        if key not in fields or (rest and not isinstance(fields[key], dict)):
+            raise ValueError(f"Unknown field: {prefix}{'.'.join(path)}")
+        wanted.setdefault(key, []).append(rest)
+
+    picked = {}
+    for key, value in fields.items():
+        if key not in wanted:
+            continue
+        rests = wanted[key]
+        if not isinstance(value, dict) or not all(rests):
+            picked[key] = value
+        else:
+            picked[key] = _pick(value, rests, f"{prefix}{key}.")
+    return picked
+
+
+# Registry of serializers by resource name
+SERIALIZERS = {}
+
+
+def register(name, serializer):
+    """Add a serializer to the registry under the given resource name"""
+    SERIALIZERS[name] = serializer
+    return serializer
+
+
+def serializer_for(name, fields=None):
+    """Look up the serializer for a resource.
+
+    Args:
+        name: resource name
+        fields: optional comma separated list of dotted field paths, as sent in
+            the ?fields= query parameter
+
+    Raises:
+        ValueError: if fields names an unknown field
+    """
+    serializer = SERIALIZERS[name]
+    paths = frozenset(path.strip() for path in (fields or "").split(",") if path.strip())
+    return serializer.subset(paths) if paths else serializer
+
+
+register("business", Serializer(
+    Business,
+    {
+        "businessId": Business.id,
+        "legalName": Business.legalName,
+        "displayName": Business.displayName,
+        "websiteLink": Business.websiteLink,
+        "currency": Business.currency,
+        "businessType": Business.businessType,
+        "businessGst": Business.businessGst,
+        "businessPan": Business.businessPan,
+        "businessLogo": Business.businessLogo,
+        "orderSystem": Business.orderSystem,
+        "contact": {
+            "contactId": Contact.id,
+            "email": Contact.email,
+            "phoneCode": Contact.phoneCode,
+            "phoneNumber": Contact.phoneNumber,
+            "address": {
+                "addressId": Address.id,
+                "fullAddress": Address.fullAddress,
+                "district": Address.district,
+                "city": Address.city,
+                "country": Address.country,
+                "addressState": Address.addressState,
+                "postalCode": Address.postalCode,
+                "directions": Address.directions,
+            },
+        },
+    },
+    joins=(
+        (Contact, Business.contactId == Contact.id),
+        (Address, Contact.addressId == Address.id),
+    ),
+))
+
+register("business_user_rights", Serializer(
+    BusinessUserRights,
+    {
+        "id": BusinessUserRights.id,
+        "businessId": BusinessUserRights.businessId,
+        "userId": BusinessUserRights.userId,
+        "productRights": BusinessUserRights.productRights,
+        "inventoryRights": BusinessUserRights.inventoryRights,
+        "salesRights": BusinessUserRights.salesRights,
+        "salesPosRights": BusinessUserRights.salesPosRights,
+        "suppliersRights": BusinessUserRights.suppliersRights,
+        "analyticsViewRights": BusinessUserRights.analyticsViewRights,
+        "ownerRights": BusinessUserRights.ownerRights,
+    },
+))
+
+register("user", Serializer(
+    User,
+    {
+        "id": User.id,
+        "email": User.email,
+        "first_name": User.first_name,
+        "last_name": User.last_name,
+        "email_confirmed": User.email_confirmed,
+        "profile_picture": User.profile_picture,
+        "is_active": User.is_active,
+        "is_admin": User.is_admin,
+        "createdAt": User.createdAt,
+        "updatedAt": User.updatedAt,
+    },
+))
@@ -0,0 +1,50 @@
+import hashlib
+import json
+import os
+import tempfile
+import yaml
+
+
+# libyaml's parser is several times faster than the pure Python one
+SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def load_swagger_template(path, cache_dir):
+    """Load the OpenAPI template, parsing the YAML only when it changed.
+
+    The parsed spec is cached as JSON under cache_dir, named after the
+    sha256 of the YAML file, so workers booting from an unchanged file just
+    read the JSON. Cache files are written atomically, so workers booting at
+    the same time never read a half written one.
+
+    Args:
+        path: the swagger YAML file
+        cache_dir: directory for the compiled JSON, created if missing
+
+    Returns:
+        the spec as a dict
+    """
+    with open(path, 'rb') as file:
+        source = file.read()
+    digest = hashlib.sha256(source).hexdigest()
+    cache_path = os.path.join(cache_dir, f'swagger-{digest[:16]}.json')
+
+    try:
+        with open(cache_path, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        pass
+
+    # Round trip through JSON so a fresh parse and a cache hit give the same
+    # dict, e.g. with response codes as string keys either way
+    compiled = json.dumps(yaml.load(source, Loader=SafeLoader), default=str)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as file:
+            file.write(compiled)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # A read-only deploy still works, it just parses on every boot
+        pass
+    return json.loads(compiled)
@@ -0,0 +1,89 @@
+from datetime import datetime, timezone
+from threading import Lock
+from sqlalchemy.exc import IntegrityError
+from volumx import db
+from volumx.models.revoked_token import RevokedToken
+import time
+
+
+class TokenBlocklist:
+    """Per-process set of revoked JWT ids, synced from the revoked_tokens table.
+
+    Checking a token is a dict lookup. At most once every `sync_interval`
+    seconds a request first pulls the revocations other workers added since
+    the last sync, so a token revoked elsewhere is refused here within that
+    interval. Tokens revoked by this process are refused right away. Entries
+    are pruned from memory and from the table once the token has expired.
+    """
+
+    # Rows re-read below the highest synced id on every sync, so a row whose
+    # id was allocated before a concurrent insert but committed after it
+    # isn't skipped
+    SYNC_OVERLAP = 100
+
+    def __init__(self, sync_interval=5, prune_interval=600):
+        self._lock = Lock()
+        self.configure(sync_interval, prune_interval)
+
+    def configure(self, sync_interval, prune_interval):
+        """Set the sync and prune intervals, forgetting the synced state"""
+        with self._lock:
+            self.sync_interval = sync_interval
+            self.prune_interval = prune_interval
+            self._revoked = {}
+            self._last_id = 0
+            self._next_sync = 0
+            self._next_prune = time.monotonic() + prune_interval
+
+    def is_revoked(self, jwt_header, jwt_payload):
+        """token_in_blocklist_loader callback"""
+        if time.monotonic() >= self._next_sync:
+            self.sync()
+        return jwt_payload.get('jti') in self._revoked
+
+    def revoke(self, jti, expires):
+        """Revoke a token until its expiry.
+
+        Args:
+            jti: the token's unique id
+            expires: its exp claim as a unix timestamp
+        """
+        expires_at = datetime.fromtimestamp(expires, timezone.utc).replace(tzinfo=None)
+        db.session.add(RevokedToken(jti=jti, expires_at=expires_at))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Already revoked, e.g. by a concurrent logout
+            db.session.rollback()
+        with self._lock:
+            self._revoked[jti] = expires
+
+    def sync(self):
+        """Pull revocations added since the last sync and prune when due"""
+        with self._lock:
+            if time.monotonic() < self._next_sync:
+                return
+            self._next_sync = time.monotonic() + self.sync_interval
+            last_id = self._last_id
+
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        rows = db.session.query(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at).filter(
+            RevokedToken.id > last_id - self.SYNC_OVERLAP, RevokedToken.expires_at > now
+        ).all()
+
+        with self._lock:
+            for row in rows:
+                self._revoked[row.jti] = row.expires_at.replace(tzinfo=timezone.utc).timestamp()
+                self._last_id = max(self._last_id, row.id)
+            prune = time.monotonic() >= self._next_prune
+            if prune:
+                self._next_prune = time.monotonic() + self.prune_interval
+                cutoff = time.time()
+                self._revoked = {jti: expires for jti, expires in self._revoked.items() if expires > cutoff}
+
+        if prune:
+            db.session.query(RevokedToken).filter(RevokedToken.expires_at <= now).delete(synchronize_session=False)
+            db.session.commit()
+
+
+token_blocklist = TokenBlocklist()
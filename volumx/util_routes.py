@@ -1,11 +1,13 @@
 from flask import Blueprint, jsonify, send_file, request, url_for, send_from_directory, current_app
 from werkzeug.utils import secure_filename
-from volumx.auth import login_required
+from volumx.auth import login_required, admin_required
 import os
 from volumx import db
 from dotenv import load_dotenv
-import cloudinary.uploader
 from volumx.models.user import User
+from volumx.cache_utils import cache_stats
+from volumx.db_pool import pool_status
+from volumx.db_routing import replica_router
 
 
 load_dotenv(".env")
@@ -44,3 +46,23 @@ def cron_job():
     response = {'message': 'Everything is working fine', 'data': user.format()}
     return jsonify(response)
 
+
+
+# Route for the view cache hit/miss counters of this worker, admins only
+@util_bp.route('/cache/stats', methods=['GET'])
+@admin_required
+def get_cache_stats(user):
+    return jsonify(cache_stats())
+
+
+# Route for the database connection pool metrics of this worker, admins only
+@util_bp.route('/db/pool', methods=['GET'])
+@admin_required
+def get_db_pool_stats(user):
+    engines = {}
+    for key, engine in db.engines.items():
+        status = pool_status(engine)
+        if engine in current_app.extensions.get('db_replicas', ()):
+            status.update(replica_router.status(engine))
+        engines[key or 'default'] = status
+    return jsonify({'pid': os.getpid(), 'engines': engines})